@@ -0,0 +1,141 @@
+import argparse
+import io
+import json
+import pickle
+import platform
+import random
+import sys
+import timeit
+
+import numpy as np
+
+from board import Board
+import player
+from player import menace
+from training.batch import train_batched
+
+usage = """Time the hot paths of the board, the matchboxes and training, for instance:
+  python benchmark.py --output before.json
+  python benchmark.py --compare before.json
+
+Results are written as JSON: the time per operation (the best of several repeats) and operations per second
+for each benchmark. With --compare, benchmarks that got slower by more than --tolerance are reported and the
+exit status is 1."""
+
+
+# Time function, returning the best time per call over repeat rounds of enough calls to take about 0.2 seconds
+def measure(function, repeat=5):
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+# A MENACE that has played some games, so its beads are no longer all the same
+def trained_menace(games=2000):
+    trained = player.Menace()
+    train_batched(trained, games, batch_size=1000, opponent=player.RandomMove(), rng=np.random.default_rng(0))
+    return trained
+
+
+# The benchmarks as (name, unit, function) where function performs one unit of work
+def benchmarks():
+    random.seed(0)
+    board = Board([[1, 0, 2], [0, 1, 0], [0, 0, 2]])
+    rotated = Board([[2, 0, 1], [0, 1, 0], [0, 0, 2]])
+    trained = trained_menace()
+    opponent = player.RandomMove()
+    matchbox, _ = trained.lookup(board)
+    play = list(matchbox.options)[0]
+
+    # Menace.train without printing the outcomes
+    def train_games(opponent, batch_size=None):
+        def train():
+            if batch_size:
+                train_batched(trained, 100, batch_size=batch_size, opponent=opponent)
+            else:
+                for _ in range(100):
+                    trained.game(opponent=opponent)
+        return train
+
+    def initialize_matchboxes():
+        menace._generated_stores.clear()
+        player.Menace.initialize_matchboxes()
+
+    # Menace.move without letting the game history grow
+    def menace_move():
+        trained.move(board)
+        trained.game_history.clear()
+
+    model = pickle.dumps(trained.matchboxes)
+
+    return [
+        ("board.make_move", "moves", lambda: board.make_move((1, 0))),
+        ("board.winner", "calls", board.winner),
+        ("board.legal_moves.unique", "calls", lambda: board.legal_moves(unique=True)),
+        ("board.legal_moves.all", "calls", lambda: board.legal_moves(unique=False)),
+        ("board.hash", "calls", lambda: hash(board)),
+        ("board.eq", "calls", lambda: board == rotated),
+        ("menace.initialize_matchboxes", "calls", initialize_matchboxes),
+        ("menace.initialize_matchboxes.cached", "calls", player.Menace.initialize_matchboxes),
+        ("menace.lookup", "calls", lambda: trained.lookup(board)),
+        ("menace.move", "moves", menace_move),
+        ("matchbox.move", "moves", matchbox.move),
+        ("matchbox.reinforce", "calls", lambda: matchbox.reinforce(play, 3)),
+        ("menace.train.random", "100 games", train_games(opponent)),
+        ("menace.train.self", "100 games", train_games(None)),
+        ("menace.train.batched.random", "100 games", train_games(opponent, batch_size=100)),
+        ("menace.train.batched.self", "100 games", train_games(None, batch_size=100)),
+        ("pickle.save", "calls", lambda: pickle.dump(trained.matchboxes, io.BytesIO())),
+        ("pickle.load", "calls", lambda: pickle.loads(model)),
+    ]
+
+
+def run(selection=None, repeat=5):
+    results = {}
+    for name, unit, function in benchmarks():
+        if selection and not any(part in name for part in selection):
+            continue
+        seconds = measure(function, repeat=repeat)
+        results[name] = {"unit": unit, "seconds": seconds, "per_second": 1 / seconds}
+        print("%-40s %12.3f us/%s" % (name, seconds * 1e6, unit), file=sys.stderr)
+    return {"python": platform.python_version(), "numpy": np.__version__, "results": results}
+
+
+# The benchmarks that got slower than in baseline by more than tolerance (a fraction)
+def regressions(results, baseline, tolerance=0.1):
+    slower = {}
+    for name, result in results["results"].items():
+        if name in baseline["results"]:
+            ratio = result["seconds"] / baseline["results"][name]["seconds"]
+            if ratio > 1 + tolerance:
+                slower[name] = ratio
+    return slower
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=usage, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmarks", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--output", help="write the results to this file instead of standard output")
+    parser.add_argument("--compare", help="compare the results to those in this file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown when comparing (fraction)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of rounds to take the best time from")
+    arguments = parser.parse_args(arguments)
+
+    results = run(arguments.benchmarks, repeat=arguments.repeat)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            slower = regressions(results, json.load(file), tolerance=arguments.tolerance)
+        for name, ratio in sorted(slower.items()):
+            print("%s is %.2f times slower" % (name, ratio), file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,6 @@
-import itertools
-from copy import deepcopy
+import os
 import numpy as np
 
-# define all rotations (clockwise)
-_rotations = [[[(2, 0), (1, 0), (0, 0)],
-               [(2, 1), (1, 1), (0, 1)],
-               [(2, 2), (1, 2), (0, 2)]],
-
-              [[(2, 2), (2, 1), (2, 0)],
-               [(1, 2), (1, 1), (1, 0)],
-               [(0, 2), (0, 1), (0, 0)]],
-
-              [[(0, 2), (1, 2), (2, 2)],
-               [(0, 1), (1, 1), (2, 1)],
-               [(0, 0), (1, 0), (2, 0)]]
-			  ]
-
-# flip along vertical axis
-_flip = [[(0, 2), (0, 1), (0, 0)],
-         [(1, 2), (1, 1), (1, 0)],
-         [(2, 2), (2, 1), (2, 0)]]
-
-_win_conditions = [
-        [(0, 0), (0, 1), (0, 2)],
-        [(1, 0), (1, 1), (1, 2)],
-        [(2, 0), (2, 1), (2, 2)],
-
-        [(0, 0), (1, 0), (2, 0)],
-        [(0, 1), (1, 1), (2, 1)],
-        [(0, 2), (1, 2), (2, 2)],
-
-        [(0, 0), (1, 1), (2, 2)],
-        [(2, 0), (1, 1), (0, 2)],
-				   ]
-
 
 def same_states(s1, s2):
     """
@@ -43,104 +10,323 @@ def same_states(s1, s2):
     s2 = np.array(s2)
     return np.any(np.isclose(np.mean(np.square(s1-s2), axis=(1, 2)), 0))
 
-# returns a state based on an original state and a translation matrix
-def _translate(state, translation):
-    new_state = [[state[cell[0]][cell[1]] for cell in row] for row in translation]
-    return new_state
-
 
 # returns a flattened, string version of a state
 def _state_str(state):
     return_string = ""
     for line in state:
-        return_string += "{} | {} | {}\n".format(line[0], line[1], line[2])
+        return_string += " | ".join(str(value) for value in line) + "\n"
     return return_string
 
 
-# compare all variations of the board and return the one with the smallest string representation
-def _get_minimal_rotation(state):
-    smallest_state = state
-    flipped = False
-    rotated = [[(0, 0), (0, 1), (0, 2)],
-                [(1, 0), (1, 1), (1, 2)],
-                [(2, 0), (2, 1), (2, 2)]]
+# A dict that computes the values it is asked for the first time and remembers them, standing in for a lookup table
+# that would take too long to fill in advance
+class _Table(dict):
+
+    def __init__(self, function):
+        super(_Table, self).__init__()
+        self.function = function
+
+    def __missing__(self, key):
+        value = self[key] = self.function(key)
+        return value
+
+
+# The shape of a game: a size x size board on which win_length marks in a row, column or diagonal win
+# Cells are numbered row by row: coordinate (x, y) is bit x * size + y of a player's bitboard
+# The symmetries and lines are generated from the size and kept as permutations and bitboard masks, and most
+# questions about a board are answered by tables indexed by a bitboard. Boards of up to 9 cells get complete tables
+# in advance, larger boards fill them in as positions are seen.
+class Geometry(object):
+
+    def __init__(self, size=3, win_length=None, cache_file=None):
+        self.size = size
+        self.win_length = win_length or size
+        if not 0 < self.win_length <= size:
+            raise ValueError("win_length should be between 1 and the size of the board")
+        self.cell_count = size * size
+        self.cells = [(x, y) for x in range(size) for y in range(size)]
+        self.transforms = self._symmetries()
+        self.win_masks = self._lines()
+        # The first cell is the most significant base 3 digit, so comparing codes compares the boards cell by cell
+        self.powers = [3 ** (self.cell_count - 1 - index) for index in range(self.cell_count)]
+
+        if self.cell_count <= 9:
+            every = range(1 << self.cell_count)
+            self.transform_bits = [[self._permute(bits, transform) for bits in every] for transform in self.transforms]
+            self.has_win = [self._has_win(bits) for bits in every]
+            self.empty_cells = [self._empty_cells(occupied) for occupied in every]
+            self.base3 = [self._base3(bits) for bits in every]
+            self.load_symmetry_table(cache_file)
+        else:
+            self.transform_bits = [_Table(lambda bits, transform=transform: self._permute(bits, transform))
+                                   for transform in self.transforms]
+            self.has_win = _Table(self._has_win)
+            self.empty_cells = _Table(self._empty_cells)
+            self.base3 = _Table(self._base3)
+            self.symmetry = _Table(lambda code: self._canonical(*self.bits(code)))
+            self.symmetry_table = None
+
+    # All symmetries of the board as permutations: cell i of the transformed board is cell transform[i] of the
+    # original. The identity comes first, then the flip along the vertical axis, and then each clockwise rotation
+    # followed by the flipped version of that rotation, so ties between equally small boards always resolve the same
+    def _symmetries(self):
+        size = self.size
+        identity = tuple(range(self.cell_count))
+        flip = tuple(x * size + size - 1 - y for x, y in self.cells)
+        rotation = tuple((size - 1 - y) * size + x for x, y in self.cells)
+        transforms = [identity, flip]
+        rotated = identity
+        for _ in range(3):
+            rotated = tuple(rotated[index] for index in rotation)
+            transforms.append(rotated)
+            transforms.append(tuple(flip[index] for index in rotated))
+        return transforms
+
+    # Every line of win_length cells (along a row, a column or either diagonal) as a bitboard mask
+    def _lines(self):
+        masks = []
+        for x, y in self.cells:
+            for step_x, step_y in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                line = [(x + step * step_x, y + step * step_y) for step in range(self.win_length)]
+                if all(0 <= cell_x < self.size and 0 <= cell_y < self.size for cell_x, cell_y in line):
+                    masks.append(sum(1 << (cell_x * self.size + cell_y) for cell_x, cell_y in line))
+        return masks
+
+    def _permute(self, bits, transform):
+        return sum(1 << index for index in range(self.cell_count) if bits >> transform[index] & 1)
+
+    def _has_win(self, bits):
+        return any(bits & mask == mask for mask in self.win_masks)
+
+    def _empty_cells(self, occupied):
+        return [self.cells[index] for index in range(self.cell_count) if not occupied >> index & 1]
+
+    def _base3(self, bits):
+        return sum(self.powers[index] for index in range(self.cell_count) if bits >> index & 1)
+
+    # returns the canonical code of a position together with the index of the transform that produces it
+    def _canonical(self, crosses, noughts):
+        base3 = self.base3
+        smallest, smallest_transform = base3[crosses] + 2 * base3[noughts], 0
+        for transform in range(1, 8):
+            transform_bits = self.transform_bits[transform]
+            code = base3[transform_bits[crosses]] + 2 * base3[transform_bits[noughts]]
+            if code < smallest:
+                smallest, smallest_transform = code, transform
+        return smallest, smallest_transform
+
+    # The bitboards of the crosses and noughts of the board with the given base 3 code
+    def bits(self, code):
+        crosses = noughts = 0
+        for index in range(self.cell_count - 1, -1, -1):
+            code, value = divmod(code, 3)
+            if value == 1:
+                crosses |= 1 << index
+            elif value == 2:
+                noughts |= 1 << index
+        return crosses, noughts
+
+    # The symmetry table maps the code of each of the 3^cells boards to its canonical code (row 0) and the transform
+    # that reaches it (row 1), which turns equality, hashing and translating coordinates into single list lookups
+    def _build_symmetry_table(self):
+        table = [(0, 0)] * 3 ** self.cell_count
+        every = range(1 << self.cell_count)
+        for crosses in every:
+            for noughts in every:
+                if not crosses & noughts:
+                    table[self.base3[crosses] + 2 * self.base3[noughts]] = self._canonical(crosses, noughts)
+        return np.array(table, dtype=np.int32).T
+
+    # Building the table takes a moment, so it can be kept on disk: pass a cache_file and the table is loaded from
+    # it when it exists, or written to it after building otherwise
+    def load_symmetry_table(self, cache_file=None):
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, "rb") as file:
+                table = np.load(file)
+        else:
+            table = self._build_symmetry_table()
+            if cache_file:
+                with open(cache_file, "wb") as file:
+                    np.save(file, table)
+        self.symmetry_table = table
+        # Plain lists index faster than numpy arrays for single lookups
+        self.symmetry = list(zip(table[0].tolist(), table[1].tolist()))
+        return table
+
+    # Map a coordinate on a minimal board back onto the board that the given transform made minimal
+    def transform_coordinate(self, coordinate, transform):
+        return self.cells[self.transforms[transform][coordinate[0] * self.size + coordinate[1]]]
+
+
+# The standard game, its symmetry table read from (or written to) MENACE_SYMMETRY_CACHE when that is set
+STANDARD = Geometry(3, 3, cache_file=os.environ.get("MENACE_SYMMETRY_CACHE"))
+_geometries = {(3, 3): STANDARD}
+
+
+# The geometry of a size x size board with win_length (by default size) in a row to win, built once per process
+def get_geometry(size=3, win_length=None):
+    key = size, win_length or size
+    if key not in _geometries:
+        _geometries[key] = Geometry(*key)
+    return _geometries[key]
+
+
+# (Re)load the symmetry table of the standard game, see Geometry.load_symmetry_table
+def load_symmetry_table(cache_file=None):
+    global _np_symmetry_table
+    _np_symmetry_table = STANDARD.load_symmetry_table(cache_file)
+    return _np_symmetry_table
 
-    # check if the flipped state is smaller
-    flipped_state = _translate(state, _flip)
-    if _state_str(flipped_state) < _state_str(smallest_state):
-        smallest_state = flipped_state
-        flipped = True
 
-    # check all rotations of both regular and flipped
-    for rotation in _rotations:
-        if _state_str(_translate(state, rotation)) < _state_str(smallest_state):
-            smallest_state = _translate(state, rotation)
-            rotated = rotation
-            flipped = False
-        if _state_str(_translate(flipped_state, rotation)) < _state_str(smallest_state):
-            smallest_state = _translate(flipped_state, rotation)
-            rotated=rotation
-            flipped = True
+# Map a coordinate on a minimal board back onto the board that the given transform made minimal
+def transform_coordinate(coordinate, transform, geometry=STANDARD):
+    return geometry.transform_coordinate(coordinate, transform)
 
-    return smallest_state, flipped, rotated
 
+# The same logic for arrays of bitboards, to play many games of the standard game at once
+_np_base3 = np.array(STANDARD.base3)
+_np_has_win = np.array(STANDARD.has_win)
+_np_popcount = np.array([bin(bits).count("1") for bits in range(1 << STANDARD.cell_count)])
+_np_transforms = np.array(STANDARD.transforms)
+_np_inverse_transforms = np.argsort(_np_transforms, axis=1)
+_np_symmetry_table = STANDARD.symmetry_table
 
-# return the state with a specific cell changed to value
-# TODO: make it so you could call board[x, y] = value to a get a new board with that change
-def _state_set_cell(state, coordinate, value):
-    new_state = deepcopy(state)
-    new_state[coordinate[0]][coordinate[1]] = value
-    return new_state
+
+# The base 3 codes of the boards
+def batch_codes(crosses, noughts):
+    return _np_base3[crosses] + 2 * _np_base3[noughts]
+
+
+# The canonical codes of the boards and the transforms that reach them
+def batch_symmetry(crosses, noughts):
+    codes = batch_codes(crosses, noughts)
+    return _np_symmetry_table[0][codes], _np_symmetry_table[1][codes]
+
+
+# The winner of each board: 0 while the game goes on, 1 or 2 for the winning player and 3 for a draw
+def batch_winner(crosses, noughts):
+    winners = np.where(_np_popcount[crosses | noughts] == STANDARD.cell_count, 3, 0)
+    winners[_np_has_win[noughts]] = 2
+    winners[_np_has_win[crosses]] = 1
+    return winners
+
+
+# Map cell indices on minimal boards back onto the boards that the transforms made minimal
+def batch_transform_cells(cells, transforms):
+    return _np_transforms[transforms, cells]
+
+
+# Map cell indices on boards onto the minimal boards the transforms make of them (the inverse of the above)
+def batch_minimal_cells(cells, transforms):
+    return _np_inverse_transforms[transforms, cells]
 
 
 class Board(object):
+    # A board is two bitboards, one for the crosses of player 1 and one for the noughts of player 2, and the
+    # geometry of the game they are played on
+    __slots__ = ("crosses", "noughts", "geometry")
+
     def __str__(self):
         return _state_str(self.state)
 
     # Make it possible to use == on two boards
     def __eq__(self, other):
-        smallest, _, _ = _get_minimal_rotation(self.state)
-        other_smallest, _, _ = _get_minimal_rotation(other.state)
-        return _state_str(smallest) == _state_str(other_smallest)
+        return self.key() == other.key() and self.geometry is other.geometry
 
     # Allows Boards to be used as the key in a set
     def __hash__(self):
-        smallest, _, _ = _get_minimal_rotation(self.state)
-        return hash(str(_state_str(smallest)))
+        return hash(self.key())
 
-    def __init__(self, state=None, minimal=False):
+    # A board of size x size cells where win_length in a row wins (by default the whole row), empty unless a state
+    # is given, in which case its size is taken from the state
+    def __init__(self, state=None, minimal=False, size=3, win_length=None):
         # If no initial state is give, generate an empty board
         # Otherwise, use the given state
-        if state is None:
-            self.state = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
-        elif minimal:
-            self.state, _, _ = _get_minimal_rotation(deepcopy(state))
-        else:
-            self.state = state
+        if state is not None:
+            size = len(state)
+        self.geometry = get_geometry(size, win_length)
+        self.crosses = 0
+        self.noughts = 0
+        if state is not None:
+            for index, (x, y) in enumerate(self.geometry.cells):
+                if state[x][y] == 1:
+                    self.crosses |= 1 << index
+                elif state[x][y] == 2:
+                    self.noughts |= 1 << index
+            if minimal:
+                self.make_minimal()
+
+    # Build a board straight from its bitboards, skipping the parsing in __init__
+    @classmethod
+    def from_bits(cls, crosses, noughts, geometry=STANDARD):
+        board = cls.__new__(cls)
+        board.crosses = crosses
+        board.noughts = noughts
+        board.geometry = geometry
+        return board
+
+    # Build a board from its base 3 code (see code)
+    @classmethod
+    def from_code(cls, code, geometry=STANDARD):
+        return cls.from_bits(*geometry.bits(code), geometry=geometry)
+
+    # Standard boards pickle as their two bitboards, others also record their size and win length
+    def __getstate__(self):
+        if self.geometry is STANDARD:
+            return self.crosses, self.noughts
+        return self.crosses, self.noughts, self.geometry.size, self.geometry.win_length
+
+    # Pickles made before the bitboards stored the board as a 'state' list
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            board = Board(state["state"])
+            state = board.crosses, board.noughts
+        self.crosses, self.noughts = state[:2]
+        self.geometry = get_geometry(*state[2:]) if len(state) > 2 else STANDARD
+
+    # The number of rows (and columns) of the board
+    @property
+    def size(self):
+        return self.geometry.size
+
+    # The board as a list of rows, as it used to be stored
+    @property
+    def state(self):
+        size = self.geometry.size
+        return [[self.cell((x, y)) for y in range(size)] for x in range(size)]
 
     # Get the value of a cell
     # TODO: make it so you can call board[x, y] instead of board.cell(x,y)
     def cell(self, coordinate):
-        return self.state[coordinate[0]][coordinate[1]]
+        bit = 1 << (coordinate[0] * self.geometry.size + coordinate[1])
+        if self.crosses & bit:
+            return 1
+        if self.noughts & bit:
+            return 2
+        return 0
 
     # The most recent move is equal to the number of none zero cells
     # i.e. the most recent move on a board with one cell set was the first move
     def turn(self):
-        count = 0
-        for cell in itertools.chain(*self.state):
-            if cell > 0:
-                count += 1
-        return count
+        return (self.crosses | self.noughts).bit_count()
 
     def make_move(self, coordinate, player=None):
-        if player is not None and player is not self.player():
+        if player is not None and player != self.player():
             raise ValueError('It is not that player\'s move')
-        if self.cell(coordinate) != 0:
+        geometry = self.geometry
+        bit = 1 << (coordinate[0] * geometry.size + coordinate[1])
+        occupied = self.crosses | self.noughts
+        if occupied & bit:
             print(coordinate, " is not empty")
             return self
+        board = Board.__new__(Board)
+        board.geometry = geometry
+        if occupied.bit_count() % 2:
+            board.crosses, board.noughts = self.crosses, self.noughts | bit
         else:
-            new_state = _state_set_cell(self.state, coordinate, self.player())
-            return Board(new_state)
+            board.crosses, board.noughts = self.crosses | bit, self.noughts
+        return board
 
     # Returns the player who should make the next move (player 1 or player 2)
     def player(self):
@@ -149,44 +335,60 @@ class Board(object):
     # Returns 'False' if there is no winner yet
     # Returns 1 or 2 to indicate the winning player, or 3 to indicate a draw
     def winner(self):
-        for condition in _win_conditions:
-            # A win condition is always a list of 3 coordinates
-            if self.cell(condition[0]) == self.cell(condition[1]) == self.cell(condition[2]):
-                # "empty" cells do not represent a win condition...
-                if self.cell(condition[0]) != 0:
-                    return self.cell(condition[0])
-        else:
-            if self.turn() == 9:
-                # No win condition but the board is full, this is a draw
-                return 3
-            return False
+        geometry = self.geometry
+        if geometry.has_win[self.crosses]:
+            return 1
+        if geometry.has_win[self.noughts]:
+            return 2
+        if (self.crosses | self.noughts).bit_count() == geometry.cell_count:
+            # No win condition but the board is full, this is a draw
+            return 3
+        return False
+
+    # Return the empty cells where player (by default the player to move) would complete a line
+    def winning_moves(self, player=None):
+        if player is None:
+            player = self.player()
+        own = self.crosses if player == 1 else self.noughts
+        cells, has_win = self.geometry.cells, self.geometry.has_win
+        return [cells[index] for index in range(self.geometry.cell_count)
+                if not (self.crosses | self.noughts) >> index & 1 and has_win[own | 1 << index]]
 
     # Return a set of possible moves given a board
     # The usage of set ensures every move appears exactly once
     def legal_moves(self, unique=True):
-        moves = {}
-        potential_moves = [[(x, y) for y in range(3) if self.state[x][y] == 0] for x in range(3)]
+        potential_moves = self.geometry.empty_cells[self.crosses | self.noughts]
         if unique:
-            for potential_move in itertools.chain(*potential_moves):
-                moves[Board(state=_state_set_cell(self.state, potential_move, self.player()))] = potential_move
+            moves = {}
+            for potential_move in potential_moves:
+                moves[self.make_move(potential_move).key()] = potential_move
             return moves.values()
         else:
-            return list(itertools.chain(*potential_moves))
+            return list(potential_moves)
+
+    # The board encoded as a base 3 number, the first cell being the most significant digit
+    def code(self):
+        base3 = self.geometry.base3
+        return base3[self.crosses] + 2 * base3[self.noughts]
+
+    # The code of the minimal (canonical) version of this board and the index of the transform that reaches it
+    def symmetry(self):
+        return self.geometry.symmetry[self.code()]
+
+    # Boards that are rotations or mirror images of each other share a key
+    def key(self):
+        return self.geometry.symmetry[self.code()][0]
 
     def is_minimal(self):
-        minimal_state, flipped, rotated = _get_minimal_rotation(self.state)
-        return not flipped and rotated == [[(0, 0), (0, 1), (0, 2)], [(1, 0), (1, 1), (1, 2)], [(2, 0), (2, 1), (2, 2)]]
+        return self.geometry.symmetry[self.code()][1] == 0
 
     def make_minimal(self):
-        self.state, _, _ = _get_minimal_rotation(self.state)
+        transform_bits = self.geometry.transform_bits[self.geometry.symmetry[self.code()][1]]
+        self.crosses = transform_bits[self.crosses]
+        self.noughts = transform_bits[self.noughts]
 
     def translate(self, other_board, coordinate):
         if other_board.is_minimal():
-            minimal_state, flipped, rotated = _get_minimal_rotation(self.state)
-            coordinate = rotated[coordinate[0]][coordinate[1]]
-            if flipped:
-                coordinate = _flip[coordinate[0]][coordinate[1]]
-            return coordinate
+            return self.geometry.transform_coordinate(coordinate, self.geometry.symmetry[self.code()][1])
         else:
             raise ValueError('second board should be in minimal state')
-
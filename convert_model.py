@@ -0,0 +1,10 @@
+import sys
+
+from player.model_file import convert
+
+# Convert a pickle of matchboxes into a model file that Menace can memory map
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python convert_model.py <input.pickle> <output.menace>")
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
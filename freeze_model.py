@@ -0,0 +1,12 @@
+import sys
+
+from player import Menace
+from player.frozen import export_policy
+
+# Freeze a trained MENACE (a pickle or a model file) into a policy file that FrozenMenace plays from
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python freeze_model.py <input.pickle|input.menace> <output.policy>")
+        sys.exit(1)
+    boards = export_policy(Menace(input_file=sys.argv[1]), sys.argv[2])
+    print("Froze the moves on %d boards into %s" % (boards, sys.argv[2]))
@@ -0,0 +1,103 @@
+import os
+import struct
+
+import numpy as np
+
+# A game log is a header followed by one record per game: the cells played in order (cell index x * size + y, NO_MOVE
+# after the last move), one byte each, and then the winner (1 or 2, or 3 for a draw), a 10 byte record for 3 x 3
+MAGIC = b"MENACELG"
+VERSION = 1
+EXTENSION = ".games"
+NO_MOVE = 255
+_header = struct.Struct("<8sBBB5x")
+
+
+# Append-only log of finished games, for instance to train on again later (see training.replay)
+# Records are buffered and written every buffer_games games (and on flush or close)
+# A log that exists already is appended to, provided it was written for the same size and win_length
+class GameLog(object):
+
+    def __init__(self, path, size=3, win_length=None, buffer_games=1000):
+        self.path = path
+        self.size = size
+        self.win_length = win_length or size
+        self.cell_count = size * size
+        self.buffer_games = buffer_games
+        self.buffer = bytearray()
+        self.buffered = 0
+        self.games = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            header = read_header(path)
+            if header != (size, self.win_length):
+                raise ValueError("%s logs games on %d x %d boards with %d in a row" % ((path, header[0]) + header))
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(_header.pack(MAGIC, VERSION, size, self.win_length))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    # Log a game from the coordinates of its moves (or their cell indices) and its winner
+    def record(self, moves, winner):
+        record = bytearray([NO_MOVE] * (self.cell_count + 1))
+        for turn, move in enumerate(moves):
+            record[turn] = move if isinstance(move, int) else move[0] * self.size + move[1]
+        record[-1] = winner
+        self.buffer += record
+        self.buffered += 1
+        self.games += 1
+        if self.buffered >= self.buffer_games:
+            self.flush()
+
+    # Log many games at once: cells holds the cells played (games x cells, NO_MOVE after the last move)
+    def record_batch(self, cells, winners):
+        records = np.empty((len(winners), self.cell_count + 1), dtype=np.uint8)
+        records[:, :-1] = cells
+        records[:, -1] = winners
+        self.buffer += records.tobytes()
+        self.buffered += len(winners)
+        self.games += len(winners)
+        if self.buffered >= self.buffer_games:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer = bytearray()
+        self.buffered = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+# The size and win length of the games in the log at path
+def read_header(path):
+    with open(path, "rb") as file:
+        data = file.read(_header.size)
+    if len(data) < _header.size:
+        raise ValueError("%s is not a game log" % path)
+    magic, version, size, win_length = _header.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("%s is not a game log" % path)
+    if version != VERSION:
+        raise ValueError("%s is a game log of version %d, expected version %d" % (path, version, VERSION))
+    return size, win_length
+
+
+# Read the log at path: returns the size and win length of its games, the cells played (games x cells, NO_MOVE after
+# the last move) and the winners
+# The log is memory mapped, and a record that was only partly written (a crash while logging) is ignored
+def read_log(path):
+    size, win_length = read_header(path)
+    record_size = size * size + 1
+    games = (os.path.getsize(path) - _header.size) // record_size
+    if games == 0:
+        return size, win_length, np.zeros((0, record_size - 1), dtype=np.uint8), np.zeros(0, dtype=np.uint8)
+    records = np.memmap(path, dtype=np.uint8, mode="r", offset=_header.size, shape=(games, record_size))
+    return size, win_length, records[:, :-1], records[:, -1]
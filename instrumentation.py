@@ -0,0 +1,129 @@
+import functools
+import importlib
+import json
+import sys
+import time
+
+# Opt-in timers and counters for the game loops
+# Enabling instrumentation wraps the methods below in timers, disabling it puts the original methods back, so
+# there is no cost at all while it is disabled (apart from a check once per game in the game loops)
+# Timer name, then the module, class and method it times
+_timed_methods = [
+    ("move", "player.menace", "Menace", "move"),
+    ("move.lookup", "player.menace", "Menace", "lookup"),
+    ("move.sampling", "player.menace", "Matchbox", "move"),
+    ("reinforce", "player.bead_store", "BeadStore", "reinforce"),
+    ("reinforce", "player.bead_store", "BeadStore", "apply"),
+    ("eviction", "player.lazy_store", "LazyMatchboxes", "evict"),
+    ("persistence", "player.menace", "Menace", "snapshot"),
+    ("persistence", "player.menace", "Menace", "write_snapshot"),
+    ("persistence", "player.journal", "Journal", "append"),
+    ("render", "user_interface.command_line", "CommandLine", "render"),
+    ("render", "user_interface.minimal", "Minimal", "render"),
+    # Only when the graphical interface was imported already, as importing it opens a window
+    ("render", "user_interface.graphical", "Graphical", "render"),
+]
+
+_profiler = None
+
+
+class Profiler(object):
+
+    def __init__(self, report_file=None, report_interval=10.0):
+        self.report_file = report_file
+        self.report_interval = report_interval
+        self.reset()
+
+    def reset(self):
+        self.timers = {}
+        self.counters = {"games": 0, "moves": 0}
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    def add_time(self, name, seconds):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = [0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+
+    def count_games(self, games, moves):
+        self.counters["games"] += games
+        self.counters["moves"] += moves
+        if self.report_file is not None and time.perf_counter() - self.last_report >= self.report_interval:
+            self.report()
+
+    # Write the snapshot as a line of JSON to report_file
+    def report(self):
+        self.last_report = time.perf_counter()
+        self.report_file.write(json.dumps(self.snapshot()) + "\n")
+        self.report_file.flush()
+
+    def snapshot(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "time": time.time(),
+            "elapsed": elapsed,
+            "timers": {name: {"calls": calls, "seconds": seconds, "mean": seconds / calls}
+                       for name, (calls, seconds) in self.timers.items()},
+            "counters": dict(self.counters),
+            "games_per_second": self.counters["games"] / elapsed,
+            "moves_per_second": self.counters["moves"] / elapsed,
+        }
+
+
+def _timed(profiler, name, method):
+    @functools.wraps(method)
+    def timed(*arguments, **keywords):
+        start = time.perf_counter()
+        try:
+            return method(*arguments, **keywords)
+        finally:
+            profiler.add_time(name, time.perf_counter() - start)
+    timed.original = method
+    return timed
+
+
+def _classes():
+    for name, module_name, class_name, method_name in _timed_methods:
+        if module_name == "user_interface.graphical" and module_name not in sys.modules:
+            continue
+        yield name, getattr(importlib.import_module(module_name), class_name), method_name
+
+
+# Start timing; with a report_file a snapshot is written to it as a JSON line every report_interval seconds
+def enable(report_file=None, report_interval=10.0):
+    global _profiler
+    disable()
+    _profiler = Profiler(report_file=report_file, report_interval=report_interval)
+    for name, cls, method_name in _classes():
+        setattr(cls, method_name, _timed(_profiler, name, cls.__dict__[method_name]))
+    return _profiler
+
+
+def disable():
+    global _profiler
+    if _profiler is None:
+        return
+    for _, cls, method_name in _classes():
+        method = cls.__dict__[method_name]
+        if hasattr(method, "original"):
+            setattr(cls, method_name, method.original)
+    _profiler = None
+
+
+def enabled():
+    return _profiler is not None
+
+
+# The timers and counters so far, or None when instrumentation is disabled
+def snapshot():
+    if _profiler is None:
+        return None
+    return _profiler.snapshot()
+
+
+# Called by the game loops when games finish, with the number of moves made in them
+def count_games(games=1, moves=0):
+    if _profiler is not None:
+        _profiler.count_games(games, moves)
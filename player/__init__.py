@@ -1,4 +1,6 @@
 from player.player import Player
 from player.menace import Menace
 from player.random_move import RandomMove
-from player.human import Human
\ No newline at end of file
+from player.human import Human
+from player.perfect import Perfect
+from player.frozen import FrozenMenace
@@ -0,0 +1,158 @@
+import numpy as np
+
+
+# The beads of many matchboxes kept together in one array: a row per matchbox, a column per cell of the board
+# A cell without beads is not (or no longer) an option, legal remembers which cells started out as options
+# cumulative holds the running totals of the beads along each row (its last column being the total of the row),
+# which every change to the beads keeps up to date, so picking a move is a single draw and a binary search
+# rewards are the change in beads of a move in a won, drawn and lost game, and keep_alive the beads an option gets
+# instead of running out when it is the last option of its matchbox; an instance can set its own
+class BeadStore(object):
+    rewards = (3, 0, -1)
+    keep_alive = 100
+
+    def __init__(self, capacity=1, cells=9):
+        self.beads = np.zeros((capacity, cells), dtype=np.int64)
+        self.cumulative = np.zeros((capacity, cells), dtype=np.int64)
+        self.legal = np.zeros((capacity, cells), dtype=bool)
+        # The key of the board each row belongs to and the player that moves from that board
+        self.keys = np.zeros(capacity, dtype=np.int64)
+        self.players = np.zeros(capacity, dtype=np.int8)
+        self.rows = {}
+        self.size = 0
+        # Counts the snapshots written of this store, see player.journal
+        self.generation = 0
+
+    def __len__(self):
+        return self.size
+
+    # Only the rows in use end up in a pickle, and the running totals are recomputed
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ("beads", "legal", "keys", "players"):
+            state[name] = np.array(state[name][:self.size])
+        del state["cumulative"]
+        return state
+
+    def __setstate__(self, state):
+        self.generation = 0
+        self.__dict__.update(state)
+        self.refresh()
+
+    # Recompute the running totals of the given rows (all rows by default), after writing to beads directly
+    def refresh(self, rows=slice(None)):
+        if not hasattr(self, "cumulative") or self.cumulative.shape != self.beads.shape:
+            self.cumulative = np.zeros(self.beads.shape, dtype=np.int64)
+        self.cumulative[rows] = np.cumsum(self.beads[rows], axis=-1)
+
+    # A copy of the rows in use, held in memory
+    def copy(self):
+        store = BeadStore.__new__(BeadStore)
+        store.__setstate__(self.__getstate__())
+        store.rows = dict(self.rows)
+        return store
+
+    def _grow(self):
+        capacity = max(2 * len(self.beads), 1)
+        for name in ("beads", "cumulative", "legal", "keys", "players"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    # Add a row for the board with the given key, with initial_value beads for each of the cells in moves
+    # A board that already has a row keeps it (and its beads)
+    def add(self, key, player, moves, initial_value=7):
+        if key in self.rows:
+            return self.rows[key]
+        if self.size == len(self.beads):
+            self._grow()
+        row = self.size
+        self.size += 1
+        self.keys[row] = key
+        self.players[row] = player
+        for cell in moves:
+            self.legal[row, cell] = True
+            self.beads[row, cell] = initial_value
+        self.refresh(row)
+        self.rows[key] = row
+        return row
+
+    # Remove the row of the board with the given key, the last row moving into its place to keep the rows packed
+    # Returns the key of the board whose row moved, or None when the removed row was the last one
+    def remove(self, key):
+        row = self.rows.pop(key)
+        self.size -= 1
+        last = self.size
+        moved = None
+        if row != last:
+            for name in ("beads", "cumulative", "legal", "keys", "players"):
+                array = getattr(self, name)
+                array[row] = array[last]
+            moved = int(self.keys[row])
+            self.rows[moved] = row
+        for name in ("beads", "cumulative", "legal"):
+            getattr(self, name)[last] = 0
+        return moved
+
+    # Copy the row of a matchbox living in another store into this one and point the matchbox at it
+    def adopt(self, matchbox):
+        other, other_row = matchbox.store, matchbox.row
+        row = self.add(int(other.keys[other_row]), int(other.players[other_row]), [])
+        self.beads[row] = other.beads[other_row]
+        self.cumulative[row] = other.cumulative[other_row]
+        self.legal[row] = other.legal[other_row]
+        matchbox.store, matchbox.row = self, row
+
+    # The options of a row as a dictionary of cell index to number of beads
+    def options(self, row):
+        beads = self.beads[row]
+        return {int(cell): int(beads[cell]) for cell in np.flatnonzero(beads > 0)}
+
+    # Reinforce the moves (cells) made from the boxes in rows after a game won by winner (3 being a draw)
+    # By default (see rewards) a winning move gains 3 beads, a draw changes nothing and a losing move loses a bead
+    # An option that runs out of beads is removed, unless it is the last one: then it gets keep_alive beads instead
+    # Every row can appear only once, as is the case for the moves of a single game
+    # Returns the change in beads for each of the moves
+    def reinforce(self, rows, cells, winner):
+        rows = np.asarray(rows, dtype=np.intp)
+        cells = np.asarray(cells, dtype=np.intp)
+        beads = self.beads[rows, cells]
+        win, draw, loss = self.rewards
+        if winner == 3:
+            deltas = np.full(len(rows), draw, dtype=np.int64)
+        else:
+            deltas = np.where(self.players[rows] == winner, win, loss).astype(np.int64)
+        if (deltas < 0).any():
+            # An option can not lose more beads than it has
+            deltas = np.maximum(deltas, -beads)
+            last_option = (beads + deltas <= 0) & ((self.beads[rows] > 0).sum(axis=1) == 1)
+            deltas[last_option] = self.keep_alive
+        # Moves that are no longer an option are not reinforced
+        deltas[beads <= 0] = 0
+        self.beads[rows, cells] += deltas
+        # A change in the beads of a cell changes the running totals from that cell on
+        self.cumulative[rows] += deltas[:, None] * (np.arange(self.beads.shape[1]) >= cells[:, None])
+        return deltas
+
+    # Apply changes in beads gathered over many games, rows may repeat
+    # An option ending up without beads is removed, unless that empties its matchbox: then the options removed
+    # from that box stay with 1 + keep_alive beads, as if they reached their last bead and got keep_alive beads
+    def apply(self, rows, cells, deltas):
+        rows = np.asarray(rows, dtype=np.intp)
+        touched = np.unique(rows)
+        before = self.beads[touched]
+        np.add.at(self.beads, (rows, np.asarray(cells, dtype=np.intp)), deltas)
+        after = self.beads[touched]
+        removed = (before > 0) & (after <= 0)
+        after[after < 0] = 0
+        emptied = ~(after > 0).any(axis=1)
+        after[removed & emptied[:, None]] = 1 + self.keep_alive
+        self.beads[touched] = after
+        self.refresh(touched)
+
+    # An array that maps every board key (up to size) to its row, or -1 for boards without a row
+    def row_lookup(self, size=3 ** 9):
+        lookup = np.full(size, -1, dtype=np.intp)
+        lookup[self.keys[:self.size]] = np.arange(self.size)
+        return lookup
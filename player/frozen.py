@@ -0,0 +1,132 @@
+import bisect
+import random
+import struct
+
+import numpy as np
+
+import player
+from board import Board, STANDARD
+from player.journal import write_atomically
+
+# A policy file is a header followed by one record per board MENACE can be asked to move on: the code of the board
+# (uint32, see Board.code), the cell with the most beads (uint8) and the running totals of the beads per cell (uint32,
+# 9 per board), already mapped from the minimal board of the matchbox onto the board itself
+MAGIC = b"MENACEPL"
+VERSION = 1
+EXTENSION = ".policy"
+_header = struct.Struct("<8sIII")
+_coordinates = [divmod(cell, STANDARD.size) for cell in range(STANDARD.cell_count)]
+
+
+# The boards that can come up in a game and are not finished yet, in the order a depth first search finds them
+def _playable_boards():
+    boards = [Board()]
+    seen = {boards[0].code()}
+    while boards:
+        board = boards.pop()
+        if board.winner():
+            continue
+        yield board
+        for move in board.legal_moves(unique=False):
+            next_board = board.make_move(move)
+            code = next_board.code()
+            if code not in seen:
+                seen.add(code)
+                boards.append(next_board)
+
+
+# Write what menace would play on every board to a policy file at path, to be played by a FrozenMenace
+# A board without a matchbox (as a lazy MENACE may have, spilled matchboxes included) gets a bead for each of its
+# unique moves, the moves a new matchbox would start out with
+def export_policy(menace, path, fsync=True):
+    if (menace.geometry.size, menace.geometry.win_length) != (3, 3):
+        raise ValueError("Only MENACE for 3 x 3 games can be frozen")
+    store = menace.store
+    cells = STANDARD.cell_count
+    codes, moves, cumulative = [], [], []
+    for board in _playable_boards():
+        key, transform = board.symmetry()
+        row = store.rows.get(key)
+        beads = [0] * cells
+        if row is not None:
+            for cell, count in enumerate(store.beads[row].tolist()):
+                beads[STANDARD.transforms[transform][cell]] = max(count, 0)
+        if not any(beads):
+            for move in board.legal_moves(unique=True):
+                beads[move[0] * STANDARD.size + move[1]] = 1
+        codes.append(board.code())
+        # Ties go to the first cell of the minimal board, as with Matchbox.move
+        minimal = [beads[STANDARD.transforms[transform][cell]] for cell in range(cells)]
+        moves.append(STANDARD.transforms[transform][minimal.index(max(minimal))])
+        cumulative.append(np.cumsum(beads))
+    cumulative = np.array(cumulative, dtype=np.int64)
+    if cumulative.max() >= 1 << 32:
+        raise ValueError("A matchbox holds too many beads to freeze")
+    header = _header.pack(MAGIC, VERSION, len(codes), cells)
+    write_atomically(path, b"".join([header,
+                                     np.array(codes, dtype="<u4").tobytes(),
+                                     np.array(moves, dtype="u1").tobytes(),
+                                     cumulative.astype("<u4").tobytes()]),
+                     fsync=fsync)
+    return len(codes)
+
+
+# Read a policy file: returns the codes of its boards, their greedy moves and the running totals of their beads
+def read_policy(path):
+    with open(path, "rb") as file:
+        data = file.read(_header.size)
+    if len(data) < _header.size:
+        raise ValueError("%s is not a MENACE policy file" % path)
+    magic, version, boards, cells = _header.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("%s is not a MENACE policy file" % path)
+    if version != VERSION:
+        raise ValueError("%s has policy file version %d, expected %d" % (path, version, VERSION))
+    offset = _header.size
+    codes = np.fromfile(path, dtype="<u4", count=boards, offset=offset)
+    offset += codes.nbytes
+    moves = np.fromfile(path, dtype="u1", count=boards, offset=offset)
+    offset += moves.nbytes
+    cumulative = np.fromfile(path, dtype="<u4", count=boards * cells, offset=offset).reshape(boards, cells)
+    return codes, moves, cumulative
+
+
+# MENACE as it was when its policy was exported (see export_policy), for playing only: it never learns
+# Every board MENACE can be asked to move on has an entry in a table indexed by the code of the board, so a move is
+# a lookup (and with greedy, where the move with the most beads is always played, nothing more) followed by a draw and
+# a binary search over the running totals of the beads
+# The table is never changed after loading, so a FrozenMenace can be shared by any number of games and threads
+class FrozenMenace(player.Player):
+
+    def __init__(self, path, rng=random, greedy=False):
+        self.path = path
+        self.rng = rng
+        self.greedy = greedy
+        codes, moves, cumulative = read_policy(path)
+        self.table = [None] * (3 ** STANDARD.cell_count)
+        for code, move, totals in zip(codes.tolist(), moves.tolist(), cumulative.tolist()):
+            self.table[code] = (_coordinates[move], tuple(totals), totals[-1])
+
+    def _entry(self, board):
+        entry = self.table[board.code()]
+        if entry is None:
+            raise ValueError("No move for this board:\n%s" % board)
+        return entry
+
+    def move(self, board):
+        move, cumulative, total = self._entry(board)
+        if self.greedy:
+            return move
+        return _coordinates[bisect.bisect_right(cumulative, self.rng.random() * total)]
+
+    def policy(self, board):
+        move, cumulative, total = self._entry(board)
+        if self.greedy:
+            return {move: 1.0}
+        previous = 0
+        probabilities = {}
+        for cell, running_total in enumerate(cumulative):
+            if running_total > previous:
+                probabilities[_coordinates[cell]] = (running_total - previous) / total
+            previous = running_total
+        return probabilities
@@ -1,11 +1,27 @@
+import string
+
 import player
-from board import Board, _state_set_cell
+from board import Board
+
+# The keys for the cells of a board, row by row: the top left of the keyboard for boards of up to 4 x 4, and
+# the letters and digits in reading order for larger ones
+_key_rows = ["1234", "qwer", "asdf", "zxcv"]
+_key_sequence = string.ascii_lowercase + string.digits
+
+
+# Map the keys (as key codes) onto the coordinates of the cells of a size x size board
+def key_map(size=3):
+    if size <= 3:
+        return {ord(_key_rows[x + 1][y]): (x, y) for x in range(size) for y in range(size)}
+    if size <= 4:
+        return {ord(_key_rows[x][y]): (x, y) for x in range(size) for y in range(size)}
+    if size * size > len(_key_sequence):
+        raise ValueError("There are not enough keys for a %d x %d board" % (size, size))
+    return {ord(_key_sequence[index]): divmod(index, size) for index in range(size * size)}
 
 
 class Human(player.Player):
-    keys = {113: (0, 0), 119: (0, 1), 101: (0, 2),
-            97: (1, 0), 115: (1, 1), 100: (1, 2),
-            122: (2, 0), 120: (2, 1), 99: (2, 2)}
+    keys = key_map(3)
 
     # The human player object needs to be able to talk to the computer user through a UI
     def __init__(self, ui):
@@ -13,9 +29,10 @@ class Human(player.Player):
 
     # Asking the human player for input means waiting until the user (finally) gives 'valid' feedback
     def move(self, board):
+        keys = self.keys if board.size == 3 else key_map(board.size)
         while True:
             self.ui.tick()
             move = self.ui.get_move(board)
-            if move in self.keys:
-                coordinate = self.keys[move]
+            if move in keys:
+                coordinate = keys[move]
                 return coordinate
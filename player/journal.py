@@ -0,0 +1,78 @@
+import os
+import struct
+
+import numpy as np
+
+# A journal starts with the generation of the snapshot it belongs to, followed by one record per reinforced move:
+# the key of the board, the cell that was played and the change in beads
+_header = struct.Struct("<Q")
+_record = np.dtype([("key", "<u4"), ("cell", "u1"), ("delta", "<i2")])
+# The range of the change in beads a record can hold
+DELTA_RANGE = (int(np.iinfo(_record["delta"]).min), int(np.iinfo(_record["delta"]).max))
+
+FSYNC_POLICIES = ("always", "compact", "never")
+
+
+# Write a file by writing a temporary file next to it and moving that over it, so a crash never leaves half a file
+def write_atomically(path, data, fsync=True):
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+        file.flush()
+        if fsync:
+            os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+# Append-only log of the changes in beads since the last snapshot of a model
+# fsync decides when data is forced to disk: after every game ("always"), only when writing a snapshot
+# ("compact") or never, leaving it to the operating system
+class Journal(object):
+
+    def __init__(self, path, generation, fsync="compact"):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError("fsync should be one of %s" % ", ".join(FSYNC_POLICIES))
+        self.path = path
+        self.fsync = fsync
+        self.generation = generation
+        self.file = None
+        self.reset(generation)
+
+    # Start an empty journal for the snapshot of the given generation
+    def reset(self, generation):
+        if self.file is not None:
+            self.file.close()
+        self.generation = generation
+        write_atomically(self.path, _header.pack(generation), fsync=self.fsync != "never")
+        self.file = open(self.path, "ab")
+
+    def append(self, keys, cells, deltas):
+        records = np.zeros(len(keys), dtype=_record)
+        records["key"], records["cell"], records["delta"] = keys, cells, deltas
+        # Moves that did not change any beads need no record
+        self.file.write(records[records["delta"] != 0].tobytes())
+        self.file.flush()
+        if self.fsync == "always":
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    # Apply the journal at path to store, if it belongs to the snapshot the store was loaded from
+    # Returns the number of records applied
+    @staticmethod
+    def replay(path, store):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as file:
+            header = file.read(_header.size)
+            data = file.read()
+        if len(header) < _header.size or _header.unpack(header)[0] != store.generation:
+            # A journal for an older snapshot, its changes are already part of the snapshot
+            return 0
+        # A crash while appending can leave an incomplete last record, which is ignored
+        records = np.frombuffer(data[:len(data) - len(data) % _record.itemsize], dtype=_record)
+        for key, cell, delta in records.tolist():
+            store.beads[store.rows[key], cell] += delta
+        store.refresh()
+        return len(records)
@@ -0,0 +1,135 @@
+import collections
+import shelve
+
+from board import Board
+
+EVICTION_POLICIES = ("lru", "least-visited")
+
+
+# Matchboxes that are created the first time their board comes up, rather than all reachable ones in advance
+# create makes the matchbox for a (minimal) board, with its row in store
+# With a capacity at most that many matchboxes are kept: making room for a new one evicts the least recently used
+# ("lru") or least visited ("least-visited") matchbox, apart from the ones used in games in progress (see
+# release). Evicted matchboxes are written to spill_file (a shelve) when given and read back when their board comes
+# up again, otherwise they start over with fresh beads when they are needed again
+# hits, misses, evictions, spills and restores count what happened, see stats
+class LazyMatchboxes(object):
+
+    def __init__(self, store, create, capacity=None, eviction="lru", spill_file=None):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError("eviction should be one of %s" % ", ".join(EVICTION_POLICIES))
+        if capacity is not None and capacity < 1:
+            raise ValueError("capacity should be at least 1")
+        self.store = store
+        self.create = create
+        self.capacity = capacity
+        self.eviction = eviction
+        self.spill = shelve.open(spill_file) if spill_file else None
+        # Ordered from least to most recently used
+        self.boxes = collections.OrderedDict()
+        self.visits = {}
+        # How often the matchboxes were handed out by get and not released yet, those are never evicted
+        self.pinned = collections.Counter()
+        self.hits = self.misses = self.evictions = self.spills = self.restores = 0
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, key):
+        return key in self.boxes
+
+    # Take in a matchbox that already exists, e.g. one loaded from a file
+    def add(self, matchbox):
+        key = matchbox.board.key()
+        self.boxes[key] = matchbox
+        self.visits[key] = 0
+
+    # Return the matchbox for board (whose key is key), creating (or restoring) it when it is not there
+    def get(self, key, board):
+        self.pinned[key] += 1
+        matchbox = self.boxes.get(key)
+        if matchbox is not None:
+            self.hits += 1
+            self.boxes.move_to_end(key)
+            self.visits[key] += 1
+            return matchbox
+
+        self.misses += 1
+        if self.capacity is not None:
+            while len(self.boxes) >= self.capacity and self.evict():
+                pass
+        # The matchbox makes its board minimal, which should not change the board of the game
+        matchbox = self.create(Board.from_bits(board.crosses, board.noughts, board.geometry))
+        self.boxes[key] = matchbox
+        self.visits[key] = 1
+        if self.spill is not None and str(key) in self.spill:
+            beads, legal, visits = self.spill.pop(str(key))
+            self.store.beads[matchbox.row] = beads
+            self.store.legal[matchbox.row] = legal
+            self.store.refresh(matchbox.row)
+            self.visits[key] += visits
+            self.restores += 1
+        return matchbox
+
+    # The matchboxes with the given keys (all of them by default) may be evicted again once no game uses them,
+    # to be called with the keys of the boards of a game once it was learned from
+    def release(self, keys=None):
+        if keys is None:
+            self.pinned.clear()
+            return
+        for key in keys:
+            self.pinned[key] -= 1
+            if self.pinned[key] <= 0:
+                del self.pinned[key]
+
+    # Evict a matchbox according to the eviction policy, returns False when every matchbox is in use
+    def evict(self):
+        candidates = (key for key in self.boxes if key not in self.pinned)
+        if self.eviction == "lru":
+            key = next(candidates, None)
+        else:
+            key = min(candidates, key=self.visits.__getitem__, default=None)
+        if key is None:
+            return False
+
+        matchbox = self.boxes.pop(key)
+        visits = self.visits.pop(key)
+        if self.spill is not None:
+            self.spill[str(key)] = (self.store.beads[matchbox.row].copy(), self.store.legal[matchbox.row].copy(),
+                                    visits)
+            self.spills += 1
+        moved = self.store.remove(key)
+        if moved is not None:
+            self.boxes[moved].row = self.store.rows[moved]
+        self.evictions += 1
+        return True
+
+    # The matchboxes in memory, grouped by the round of the game their board comes up in
+    def rounds(self, cell_count=9):
+        matchboxes = [[] for _ in range(cell_count + 1)]
+        for matchbox in self.boxes.values():
+            matchboxes[matchbox.board.turn()].append(matchbox)
+        return matchboxes
+
+    # A copy of store that also holds the rows of the spilled matchboxes, so a save leaves nothing learned out
+    # player gives the player that moves from the board with a given key
+    def store_with_spilled(self, player):
+        store = self.store.copy()
+        for name, (beads, legal, _) in self.spill.items():
+            key = int(name)
+            row = store.add(key, player(key), [])
+            store.beads[row] = beads
+            store.legal[row] = legal
+            store.refresh(row)
+        return store
+
+    def stats(self):
+        lookups = max(self.hits + self.misses, 1)
+        return {"matchboxes": len(self.boxes), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups, "evictions": self.evictions, "spills": self.spills,
+                "restores": self.restores}
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
@@ -1,101 +1,425 @@
+import bisect
+import os
 import random
+import time
 import player
 import pickle
-from board import Board
+import instrumentation
+from board import Board, STANDARD, get_geometry
+from player.bead_store import BeadStore
+from player.lazy_store import LazyMatchboxes
+from player.journal import DELTA_RANGE, Journal, write_atomically
+from player import model_file
 
+# The stores built by Menace.initialize_matchboxes, for each initial_value and level of pruning
+_generated_stores = {}
+
+# Levels of pruning the options of a new matchbox
+NO_PRUNING = 0
+# Keep only the winning moves when a win is possible
+PRUNE_TO_WINS = 1
+# Also keep only the blocking moves when the opponent threatens to win (and there is no win)
+PRUNE_TO_BLOCKS = 2
+
+
+# Remove the options from moves that the given level of pruning rules out
+def prune_moves(board, moves, pruning=NO_PRUNING):
+    if pruning >= PRUNE_TO_WINS:
+        wins = board.winning_moves()
+        winning = [move for move in moves if move in wins]
+        if winning:
+            return winning
+    if pruning >= PRUNE_TO_BLOCKS:
+        threats = board.winning_moves(3 - board.player())
+        blocking = [move for move in moves if move in threats]
+        if blocking:
+            return blocking
+    return moves
 
 class Menace(player.Player):
 
-    # Build the pile of matchboxes
+    # Build a store with a row for every board that can come up in a game, up to symmetry
+    # A depth first search over the minimal boards visits each of them (and asks for its moves) exactly once
+    # Note that generating the 'even' boxes is necessary in this process
+    # (though they could theoretically be discarded)
+    # Pruned options still lead to boards that get a matchbox, as an opponent may well play them
     @staticmethod
-    def initialize_matchboxes(debug=False):
-        # Round 0 is trivial, it is the starting (empty) board
-        matchboxes = [[Matchbox(Board())]]
-        # Subsequent rounds can be found by getting all possible states that could result from the previous round
-        # Note that generating the 'even' boxes is necessary in this process
-        # (though they could theoretically be discarded)
-        for game_round in range(9):
-            # Set ensures each board can appear at most once
-            round_boards = set()
-            for matchbox in matchboxes[game_round]:
-
-                for move in matchbox.options.keys():
-                    round_boards.add(matchbox.board.make_move(move))
-
-            # Use list comprehension to generate a list of matchboxes for this game_round
-            # and append this list to the pile of matchboxes
-            matchboxes.append([Matchbox(board) for board in round_boards])
-            if debug:
-                print("Round %d has %d matchboxes" % (game_round + 1, len(matchboxes[game_round + 1])))
+    def generate_store(initial_value=7, pruning=NO_PRUNING):
+        store = BeadStore()
+        seen = {0}
+        boards = [Board()]
+        while boards:
+            board = boards.pop()
+            moves = list(board.legal_moves(unique=True))
+            options = prune_moves(board, moves, pruning)
+            store.add(board.code(), board.player(), [move[0] * 3 + move[1] for move in options], initial_value)
+            for move in moves:
+                next_board = board.make_move(move)
+                key = next_board.key()
+                if key not in seen:
+                    seen.add(key)
+                    next_board.make_minimal()
+                    boards.append(next_board)
+        return store
+
+    # Build the pile of matchboxes, with options pruned to the given level (see prune_moves)
+    # The generated store is kept for the rest of the process, and also in cache_dir when given, for each initial_value
+    # and level of pruning
+    @staticmethod
+    def initialize_matchboxes(debug=False, initial_value=7, cache_dir=None, pruning=NO_PRUNING):
+        start = time.time()
+        store = _generated_stores.get((initial_value, pruning))
+        source = "memory"
+        cache_file = None
+        if cache_dir:
+            name = "matchboxes_%d_%d%s" % (initial_value, pruning, model_file.EXTENSION)
+            cache_file = os.path.join(cache_dir, name)
+        if store is None and cache_file and os.path.exists(cache_file):
+            store = model_file.load_model(cache_file, mode="r")
+            source = cache_file
+        if store is None:
+            store = Menace.generate_store(initial_value, pruning=pruning)
+            source = "generation"
+            if cache_file:
+                model_file.save_model(cache_file, store)
+        _generated_stores[initial_value, pruning] = store
+
+        # The cached store itself is never trained
+        matchboxes = Menace.matchboxes_from_store(store.copy())
+        if debug:
+            for game_round in range(1, 10):
+                print("Round %d has %d matchboxes" % (game_round, len(matchboxes[game_round])))
+            print("Initialized %d matchboxes (%d options) from %s in %.3f seconds"
+                  % (len(store), store.legal[:len(store)].sum(), source, time.time() - start))
+        return matchboxes
+
+    # The pile of matchboxes viewing the rows of a store, for boards of the given geometry
+    @staticmethod
+    def matchboxes_from_store(store, geometry=STANDARD):
+        matchboxes = [[] for _ in range(geometry.cell_count + 1)]
+        for row, key in enumerate(store.keys[:store.size].tolist()):
+            matchbox = Matchbox.view(Board.from_code(key, geometry), store, row)
+            matchboxes[matchbox.board.turn()].append(matchbox)
         return matchboxes
 
-    def __init__(self, input_file=None, output_file=None, debug=False):
+    # input_file can be a pickle or a model file (see player.model_file), which is memory mapped with mmap_mode
+    # A model file mapped with mmap_mode="r" (shared with other processes) is read only: MENACE plays without
+    # learning, which rules out an output_file, journal persistence and lazy matchboxes
+    # Without an input_file the matchboxes are generated, or read from cache_dir if they were generated before
+    # pruning removes options from new matchboxes that are known to be bad, see prune_moves
+    # An output_file ending in .menace is written as a model file, any other output_file as a pickle
+    # With persistence="pickle" all matchboxes are written to output_file after every game
+    # With persistence="journal" only the changes of every game are appended to output_file + ".journal", and the
+    # matchboxes are written to output_file (compacting the journal) every compact_every games
+    # fsync sets when the journal is forced to disk: after every game ("always"), on compaction only ("compact")
+    # or never ("never")
+    # Moves are drawn using rng (the random module unless given, e.g. a seeded random.Random), or with greedy,
+    # MENACE always plays the option with the most beads
+    # With lazy, matchboxes are only made once their board comes up (see player.lazy_store), keeping at most
+    # capacity of them in memory, evicting them by the eviction policy and spilling evicted ones to spill_file
+    # MENACE plays on boards of size x size with win_length in a row to win, which needs lazy for any other game than
+    # 3 in a row on 3 x 3
+    # New matchboxes start with initial_value beads per option; rewards (the change in beads after a win, a draw
+    # and a loss) and keep_alive (the beads the last option of a box gets instead of running out) default to those
+    # of the matchboxes loaded, or to those of BeadStore for new ones
+    def __init__(self, input_file=None, output_file=None, debug=False, persistence="pickle", fsync="compact",
+                 compact_every=1000, mmap_mode="c", cache_dir=None, rng=random, greedy=False, pruning=NO_PRUNING,
+                 lazy=False, capacity=None, eviction="lru", spill_file=None, size=3, win_length=None, initial_value=7,
+                 rewards=None, keep_alive=None):
+        if persistence not in ("pickle", "journal"):
+            raise ValueError("persistence should be 'pickle' or 'journal'")
+        if lazy and persistence == "journal":
+            raise ValueError("lazy matchboxes can not be kept with persistence='journal'")
+        self.geometry = get_geometry(size, win_length)
+        if not lazy and self.geometry is not STANDARD:
+            raise ValueError("games other than the standard 3 x 3 one need lazy matchboxes")
         self.debug = debug
+        self.rng = rng
+        self.greedy = greedy
+        self.initial_value = initial_value
         self.matchboxes = None
-        if input_file:
+        self.lazy = None
+        self.read_only = False
+        if input_file and model_file.is_model_file(input_file):
+            self.read_only = mmap_mode == "r"
+            if self.read_only and (output_file or persistence == "journal" or lazy):
+                raise ValueError("a model mapped read only does not learn, so it can not be saved, have a journal or "
+                                 "lazy matchboxes")
+            header = model_file.read_header(input_file)
+            if (header["board_size"], header["win_length"]) != (self.geometry.size, self.geometry.win_length):
+                raise ValueError("%s holds matchboxes for %d x %d boards with %d in a row"
+                                 % (input_file, header["board_size"], header["board_size"], header["win_length"]))
+            self.matchboxes = self.matchboxes_from_store(model_file.load_model(input_file, mode=mmap_mode),
+                                                         self.geometry)
+        elif input_file:
             with open(input_file, "rb") as file:
                 self.matchboxes = pickle.load(file)
-        if self.matchboxes is None:
-            self.matchboxes = self.initialize_matchboxes(debug=debug)
+        if lazy:
+            self.build_lazy_index(capacity, eviction, spill_file, pruning)
+        else:
+            if self.matchboxes is None:
+                self.matchboxes = self.initialize_matchboxes(debug=debug, initial_value=initial_value,
+                                                             cache_dir=cache_dir, pruning=pruning)
+            self.build_index()
+        if rewards is not None:
+            self.store.rewards = tuple(rewards)
+        if keep_alive is not None:
+            self.store.keep_alive = keep_alive
+        if persistence == "journal":
+            low, high = DELTA_RANGE
+            if not all(low <= value <= high for value in self.store.rewards + (self.store.keep_alive,)):
+                raise ValueError("rewards and keep_alive should be between %d and %d with persistence='journal'"
+                                 % DELTA_RANGE)
+        if input_file and persistence == "journal":
+            replayed = Journal.replay(input_file + ".journal", self.store)
+            if debug:
+                print("Replayed %d journal records" % replayed)
         self.game_history = []
+        self.persistence = persistence
+        self.fsync = fsync
+        self.compact_every = compact_every
+        self.journal = None
+        self.games_since_save = 0
+        self.pending_snapshot = None
         self.output_file = output_file
         if self.output_file:
+            self.save()
+
+    # Write all matchboxes to output_file, which in journal mode starts a new (empty) journal
+    def save(self):
+        self.write_snapshot(self.snapshot())
+
+    # The contents of output_file for the matchboxes as they are now, the part of saving that reads them
+    # Lazy matchboxes that were spilled are saved along with the ones in memory
+    def snapshot(self):
+        store, matchboxes = self.store, self.matchboxes
+        if self.lazy is not None:
+            if self.lazy.spill:
+                store = self.lazy.store_with_spilled(lambda key: Board.from_code(key, self.geometry).player())
+                matchboxes = self.matchboxes_from_store(store, self.geometry)
+            else:
+                matchboxes = self.lazy.rounds(self.geometry.cell_count)
+        if self.persistence == "journal":
+            self.store.generation += 1
+        if self.output_file.endswith(model_file.EXTENSION):
+            return model_file.model_bytes(store, self.geometry)
+        return pickle.dumps(matchboxes)
+
+    # Write a snapshot to output_file, which in journal mode starts a new (empty) journal
+    # This only touches the files, so it can run in another thread while MENACE goes on playing (but not learning)
+    def write_snapshot(self, data):
+        if self.output_file.endswith(model_file.EXTENSION) or self.persistence == "journal":
+            write_atomically(self.output_file, data, fsync=self.fsync != "never")
+        else:
             with open(self.output_file, "wb+") as file:
-                pickle.dump(self.matchboxes, file)
+                file.write(data)
+        if self.persistence == "journal":
+            if self.journal is None:
+                self.journal = Journal(self.output_file + ".journal", self.store.generation, fsync=self.fsync)
+            else:
+                self.journal.reset(self.store.generation)
+        self.games_since_save = 0
+
+    # Close the files MENACE keeps open: the journal and the spill file of lazy matchboxes
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if self.lazy is not None:
+            self.lazy.close()
 
-    # Have the system learn from the current game_history
-    def learn(self, winner, debug=False):
+    # Have the system learn from the current game_history (or the given one, see move), unless it is read only
+    # With defer_save a save that is due is only prepared: its snapshot is left in pending_snapshot, for the caller to
+    # write with write_snapshot before MENACE learns from another game
+    def learn(self, winner, debug=False, game_history=None, defer_save=False):
+        if self.read_only:
+            return
         debug = debug or self.debug
+        if game_history is None:
+            game_history = self.game_history
+        rows = [matchbox.row for matchbox, _ in game_history]
+        cells = [move[0] * matchbox.board.size + move[1] for matchbox, move in game_history]
 
-        # Learning means manipulating the beads in the matchboxes, so have each relevant matchbox do that to itself
-        for matchbox, move_coordinate in self.game_history:
-            matchbox.reinforce(play=move_coordinate, winner=winner, debug=debug)
+        # Learning means manipulating the beads in the matchboxes
+        if debug:
+            # Have each relevant matchbox do that to itself, so it can explain what it does
+            deltas = [matchbox.reinforce(play=move_coordinate, winner=winner, debug=debug)
+                      for matchbox, move_coordinate in game_history]
+        elif game_history:
+            # All boxes share the store, so the whole game is reinforced in one go
+            deltas = self.store.reinforce(rows, cells, winner)
+        else:
+            deltas = []
 
         if self.output_file:
-            with open(self.output_file, "wb+") as file:
-                pickle.dump(self.matchboxes, file)
+            self.games_since_save += 1
+            if self.persistence == "pickle" or self.games_since_save >= self.compact_every:
+                if defer_save:
+                    self.pending_snapshot = self.snapshot()
+                else:
+                    self.save()
+            else:
+                self.journal.append(self.store.keys[rows], cells, deltas)
 
-    # Return a new board representing the move we made
-    def move(self, board):
-        # Find the matchbox for the current state, have that matchbox decide on the next move (based on its beads)
-        for matchbox in self.matchboxes[board.turn()]:
-            if matchbox.board == board:
-                move_coordinate = matchbox.move(debug=self.debug)
-                self.game_history.append((matchbox, move_coordinate))
-                return board.translate(matchbox.board, move_coordinate)
+    # Index every matchbox by the key of its (minimal) board, so finding the box for a board is a dict lookup
+    # This also moves the beads of all boxes into a single store (pickles of older versions have one per box)
+    def build_index(self):
+        self.index = {}
+        self.store = None
+        for matchboxes in self.matchboxes:
+            for matchbox in matchboxes:
+                if self.store is None:
+                    self.store = matchbox.store
+                elif matchbox.store is not self.store:
+                    self.store.adopt(matchbox)
+                self.index[matchbox.board.key()] = matchbox
+
+    # Keep the matchboxes (those loaded, if any) in a LazyMatchboxes that makes the others as their boards come up
+    def build_lazy_index(self, capacity=None, eviction="lru", spill_file=None, pruning=NO_PRUNING):
+        if self.matchboxes is not None:
+            self.build_index()
         else:
+            self.index = {}
+            self.store = BeadStore(cells=self.geometry.cell_count)
+        store = self.store
+        self.lazy = LazyMatchboxes(store, lambda board: Matchbox(board, initial_value=self.initial_value,
+                                                                 store=store, pruning=pruning),
+                                   capacity=capacity, eviction=eviction, spill_file=spill_file)
+        for matchbox in self.index.values():
+            self.lazy.add(matchbox)
+        self.index = None
+
+    # Return the matchbox for a board, and the transform that maps coordinates of the matchbox onto the board
+    def lookup(self, board):
+        key, transform = board.symmetry()
+        if self.lazy is not None:
+            return self.lazy.get(key, board), transform
+        matchbox = self.index.get(key)
+        if matchbox is None:
             print(board)
-            # self.show_state(board.move())
             raise AssertionError("No matchbox matches this board")
+        return matchbox, transform
 
-    def game_finished(self, winning_board):
-        self.learn(winning_board.winner())
-        self.game_history = []
+    # Return the coordinate of the move we make
+    # The move is remembered in game_history to learn from once the game finished, which is a single list shared
+    # by all games unless a list is given for each game, so one MENACE can play many games at the same time
+    def move(self, board, game_history=None):
+        # Find the matchbox for the current state, have that matchbox decide on the next move (based on its beads)
+        matchbox, transform = self.lookup(board)
+        move_coordinate = matchbox.move(debug=self.debug, greedy=self.greedy, rng=self.rng)
+        if game_history is None:
+            game_history = self.game_history
+        game_history.append((matchbox, move_coordinate))
+        return board.geometry.transform_coordinate(move_coordinate, transform)
 
-    # Have MENACE play a single game against itself, returns the winner
-    def game(self, debug=False):
-        board = Board()
+    # The probability of each move on board, as a dictionary of coordinates to probabilities: the share of the beads
+    # of each option in the matchbox for board (or the option with the most beads with greedy)
+    # A lazy MENACE without a matchbox for board yet picks one of the moves at random, as a new matchbox would
+    def policy(self, board):
+        key, transform = board.symmetry()
+        if self.lazy is None:
+            matchbox = self.lookup(board)[0]
+        elif key in self.lazy:
+            matchbox = self.lazy.boxes[key]
+        else:
+            moves = list(board.legal_moves(unique=True))
+            return {move: 1.0 / len(moves) for move in moves}
+        beads = self.store.beads[matchbox.row].tolist()
+        if self.greedy:
+            weights = {beads.index(max(beads)): 1}
+        else:
+            weights = {cell: count for cell, count in enumerate(beads) if count > 0}
+        total = sum(weights.values())
+        geometry = board.geometry
+        return {geometry.transform_coordinate(divmod(cell, geometry.size), transform): count / total
+                for cell, count in weights.items()}
+
+    # Learn from a finished game, then start a new game_history (the shared one unless game_history is given)
+    def game_finished(self, winning_board, game_history=None, defer_save=False):
+        self.learn(winning_board.winner(), game_history=game_history, defer_save=defer_save)
+        self.abandon(game_history)
+
+    # Forget the moves of a game without learning from them
+    def abandon(self, game_history=None):
+        if self.lazy is not None:
+            self.lazy.release(matchbox.board.key()
+                              for matchbox, _ in (self.game_history if game_history is None else game_history))
+        if game_history is None:
+            self.game_history = []
+        else:
+            del game_history[:]
+
+    # Have MENACE play a single game against itself (or as player 1 against opponent), returns the winner
+    # The game is written to game_log (a game_log.GameLog) when given
+    def game(self, debug=False, opponent=None, game_log=None):
+        board = Board(size=self.geometry.size, win_length=self.geometry.win_length)
+        moves = []
         while not board.winner():
-            board = self.move(board)
+            if opponent is None or board.player() == 1:
+                move = self.move(board)
+            else:
+                move = opponent.move(board)
+            moves.append(move)
+            board = board.make_move(move)
             if debug:
                 print(board)
+        if game_log is not None:
+            game_log.record(moves, board.winner())
+        self.game_finished(board)
+        if opponent is not None:
+            opponent.game_finished(board)
+        instrumentation.count_games(1, board.turn())
         return board.winner()
 
-    # Have MENACE play multiple games against itself
-    def train(self, iterations=100):
-        outcomes = [0, 0, 0]
-        for i in range(iterations):
-            outcome = self.game()
-            outcomes[outcome % 3] += 1
+    # Have MENACE play multiple games against itself (or against opponent)
+    # With a batch_size the games are played batch_size at a time as arrays, learning after each batch
+    # (this supports playing against itself or a RandomMove opponent, rng is a numpy random Generator)
+    # With workers the batches are spread over that many processes, merging what they learned every sync_interval
+    # games per worker, and seed makes such a run repeatable
+    # With a game_log (a game_log.GameLog) the games are written to it, which is not supported with workers
+    def train(self, iterations=100, opponent=None, batch_size=None, rng=None, workers=None, sync_interval=10000,
+              seed=None, game_log=None):
+        if workers and game_log is not None:
+            raise ValueError("games played by workers can not be logged")
+        if workers:
+            from training.parallel import train_parallel
+            outcomes = train_parallel(self, iterations, workers=workers, sync_interval=sync_interval,
+                                      batch_size=batch_size or 1000, opponent=opponent, seed=seed)
+        elif batch_size:
+            from training.batch import train_batched
+            outcomes = train_batched(self, iterations, batch_size=batch_size, opponent=opponent, rng=rng,
+                                     game_log=game_log)
+        else:
+            outcomes = [0, 0, 0]
+            for i in range(iterations):
+                outcome = self.game(opponent=opponent, game_log=game_log)
+                outcomes[outcome % 3] += 1
         print(outcomes)
 
+    # Train until the draw rate (against opponent, or in self play) reached draw_rate in patience windows of games
+    # in a row (and, with max_bead_change, the beads settled), or max_games were played
+    # Returns the learning curve, see training.convergence.train_until_converged
+    def train_until_converged(self, opponent=None, window=1000, max_games=1000000, draw_rate=0.9, patience=3,
+                              max_bead_change=None, batch_size=None, rng=None):
+        from training.convergence import ConvergenceMonitor, train_until_converged
+        monitor = ConvergenceMonitor(draw_rate=draw_rate, patience=patience, max_bead_change=max_bead_change)
+        curve = train_until_converged(self, opponent=opponent, window=window, max_games=max_games, monitor=monitor,
+                                      batch_size=batch_size, rng=rng)
+        if self.debug:
+            for record in curve:
+                print(record)
+        return curve
+
     # Print the state of each matchbox in a certain round to get an idea of the state of the learning
     def show_state(self, round=0):
-        for matchbox in self.matchboxes[round]:
+        matchboxes = self.matchboxes if self.lazy is None else self.lazy.rounds(self.geometry.cell_count)
+        for matchbox in matchboxes[round]:
             print(matchbox)
 
 # Helper class for MENACE
+# A matchbox is a view onto its row of beads in a BeadStore
 class Matchbox(object):
+    __slots__ = ("board", "store", "row")
 
     def __eq__(self, other):
         return self.board == other.board
@@ -109,66 +433,85 @@ class Matchbox(object):
         weights.sort()
         return str(self.board) + ' '.join([str(weight) for weight in weights])
 
-    # When creating a new matchbox we create a dictionary of all possible moves (asking the board for that list)
+    # When creating a new matchbox we ask the board for a list of all possible moves
     # For each move we add initial_value beads to the box (what that value should be can be experimented with)
-    def __init__(self, board, initial_value=7):
+    # Without a store to keep the beads in, the matchbox gets a store of its own
+    # With pruning, options that are known to be bad are left out (i.e. in round 5 a winning option could exist,
+    # and then there is no need to eliminate the 4 non winning options by trial and error), see prune_moves
+    def __init__(self, board, initial_value=7, store=None, pruning=NO_PRUNING):
         board.make_minimal()
         self.board = board
-        self.options = {}
-        for move in board.legal_moves(unique=True):
-            self.options[move] = initial_value
-        # TODO: check whether one of the options is a 'win', if so, all non winning options can be removed
-        # This should reduce search space and increase training speed (i.e. in round 5 a winning option could exist,
-        # but 4 non winning options need to be eliminated by trial and error now)
-
-    # We select a number between zero and the total number of beads
-    # We then look at the number of beads for each option and subtract that number from the random number
-    # Once the random number is 'depleted' we found our option
-    # So random number 0 gives us the first option, and random number = total beads gives us the last
-    def move(self, debug=False):
+        self.store = store if store is not None else BeadStore(cells=board.geometry.cell_count)
+        options = prune_moves(board, list(board.legal_moves(unique=True)), pruning)
+        self.row = self.store.add(board.key(), board.player(), [move[0] * board.size + move[1] for move in options],
+                                  initial_value)
+
+    # A matchbox for a row that already exists in store
+    @classmethod
+    def view(cls, board, store, row):
+        matchbox = cls.__new__(cls)
+        matchbox.board, matchbox.store, matchbox.row = board, store, row
+        return matchbox
+
+    def __getstate__(self):
+        return self.board, self.store, self.row
+
+    # Pickles of older versions hold a board and a dictionary of options for each matchbox
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            self.board = state["board"]
+            self.store = BeadStore(cells=self.board.geometry.cell_count)
+            self.row = self.store.add(self.board.key(), self.board.player(), [])
+            for move, beads in state["options"].items():
+                self.store.legal[self.row, move[0] * self.board.size + move[1]] = True
+                self.store.beads[self.row, move[0] * self.board.size + move[1]] = beads
+            self.store.refresh(self.row)
+        else:
+            self.board, self.store, self.row = state
+
+    # The options left in this matchbox: a dictionary of move coordinates to their number of beads
+    @property
+    def options(self):
+        return {divmod(cell, self.board.size): beads for cell, beads in self.store.options(self.row).items()}
+
+    # We select a random number between zero and the total number of beads (excluding the total itself)
+    # The running totals of the beads divide that range into one stretch per option, as long as its number of beads
+    # A binary search finds the option whose stretch holds the random number
+    # With greedy, the option with the most beads is chosen instead
+    # rng is the random number generator to use (anything with a random() method, like random.Random)
+    def move(self, debug=False, greedy=False, rng=random):
         if debug:
             print(self.options)
             print(self.board)
-        total_beads = sum(self.options.values())
-        random_move = random.randint(0, total_beads)
-        for move_candidate in self.options:
-            random_move -= self.options[move_candidate]
-            if random_move <= 0:
-                return move_candidate
-        else:
-            print("No valid move found... %d / %d, %d" % (random_move, total_beads, len(self.options.keys())))
+        if greedy:
+            return divmod(int(self.store.beads[self.row].argmax()), self.board.size)
+        cumulative = self.store.cumulative[self.row].tolist()
+        total_beads = cumulative[-1]
+        if total_beads <= 0:
+            print("No valid move found... %d options" % len(self.options))
+            return None
+        return divmod(bisect.bisect_right(cumulative, rng.random() * total_beads), self.board.size)
 
-    # Add or subtract beads according to winning or losing
+    # Add or subtract beads according to winning or losing, returns the change in beads
     def reinforce(self, play, winner, debug=False):
-        if play not in self.options.keys():
+        cell = play[0] * self.board.size + play[1]
+        if self.store.beads[self.row, cell] <= 0:
             if debug:
                 print("error, play not found")
-            return
+            return 0
+        delta = int(self.store.reinforce([self.row], [cell], winner)[0])
+        if not debug:
+            return delta
         if winner == 3:
-            # Draw
-            if debug:
-                print("Not the worst option...")
-            self.options[play] += 0
-        elif (self.board.turn() % 2) + 1 == winner:
-            # This move was part of a winning strategy
-            if debug:
-                print("Do this!")
-            self.options[play] += 3
+            print("Not the worst option...")
+        elif delta > 0 and self.board.player() == winner:
+            print("Do this!")
+        elif delta > 0:
+            # this option isn't a winner, but its the only option...
+            print("Don't do this, but keep MENACE from dying...")
+        elif self.store.beads[self.row, cell] > 0:
+            print("Do this less")
         else:
-            # This move was part of a losing strategy
-            if self.options[play] > 1:
-                if debug:
-                    print("Do this less")
-                self.options[play] -= 1
-            else:
-                # This options would drop to zero, so remove it, but prevent the matchbox from "giving up"
-                # TODO: maybe 'giving up' would be a nice feature, but it would probably require a flag in Board...
-                if len(self.options.keys()) > 1:
-                    self.options.pop(play)
-                    if debug:
-                        print("Don't do this")
-                else:
-                    # this option isn't a winner, but its the only option...
-                    self.options[play] += 100
-                    if debug:
-                        print("Don't do this, but keep MENACE from dying...")
+            # TODO: maybe 'giving up' would be a nice feature, but it would probably require a flag in Board...
+            print("Don't do this")
+        return delta
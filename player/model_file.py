@@ -0,0 +1,111 @@
+import struct
+
+import numpy as np
+
+from board import STANDARD
+from player.bead_store import BeadStore
+from player.journal import write_atomically
+
+# A model file is a header followed by the arrays of a BeadStore, each stored as is so they can be memory mapped:
+# the bead matrix (int64, rows x cells), its running totals along each row (int64, rows x cells, see
+# BeadStore.cumulative; since version 4, mapped as well so a mapped model takes no memory of its own), the legal move
+# mask (uint8, rows x cells), the key of the board of every row (uint64, the state index) and the player moving from
+# that board (int8)
+# The header records the size and win length of the game the matchboxes are for (since version 2) and the rewards
+# and keep_alive of the store (see BeadStore, since version 3); files of version 1 are all for the standard game and
+# store the keys as uint32, and older files leave the rewards and keep_alive at those of BeadStore
+MAGIC = b"MENACE\x00\x01"
+VERSION = 4
+# Menace writes output files with this extension as model files
+EXTENSION = ".menace"
+_headers = {1: struct.Struct("<8sIIIQ4x"), 2: struct.Struct("<8sIIIQBB2x"), 3: struct.Struct("<8sIIIQBB2x3qq")}
+_headers[4] = _headers[3]
+_header = _headers[VERSION]
+
+
+# Whether the file at path is a model file (and not, for instance, a pickle)
+def is_model_file(path):
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+# The header of the model file at path as a dictionary
+def read_header(path):
+    with open(path, "rb") as file:
+        data = file.read(_header.size)
+    if len(data) < len(MAGIC) + 4 or data[:len(MAGIC)] != MAGIC:
+        raise ValueError("%s is not a MENACE model file" % path)
+    version = struct.unpack_from("<I", data, len(MAGIC))[0]
+    if version not in _headers:
+        raise ValueError("%s has model file version %d, expected at most %d" % (path, version, VERSION))
+    header_struct = _headers[version]
+    if len(data) < header_struct.size:
+        raise ValueError("%s is not a MENACE model file" % path)
+    fields = header_struct.unpack(data[:header_struct.size])[2:]
+    header = {"version": version, "offset": header_struct.size, "rows": fields[0], "cells": fields[1],
+              "generation": fields[2], "board_size": 3, "win_length": 3, "rewards": BeadStore.rewards,
+              "keep_alive": BeadStore.keep_alive}
+    if version >= 2:
+        header["board_size"], header["win_length"] = fields[3:5]
+    if version >= 3:
+        header["rewards"], header["keep_alive"] = tuple(fields[5:8]), fields[8]
+    return header
+
+
+# Write store to a model file at path, for matchboxes of a game with the given geometry (the standard game unless
+# given)
+def save_model(path, store, fsync=True, geometry=STANDARD):
+    write_atomically(path, model_bytes(store, geometry), fsync=fsync)
+
+
+# The contents of a model file for store, see save_model
+def model_bytes(store, geometry=STANDARD):
+    rows, cells = store.size, store.beads.shape[1]
+    header = _header.pack(MAGIC, VERSION, rows, cells, store.generation, geometry.size, geometry.win_length,
+                          *store.rewards, store.keep_alive)
+    return b"".join([header,
+                     np.ascontiguousarray(store.beads[:rows], dtype="<i8").tobytes(),
+                     np.ascontiguousarray(store.cumulative[:rows], dtype="<i8").tobytes(),
+                     np.ascontiguousarray(store.legal[:rows], dtype="u1").tobytes(),
+                     np.ascontiguousarray(store.keys[:rows], dtype="<u8").tobytes(),
+                     np.ascontiguousarray(store.players[:rows], dtype="i1").tobytes()])
+
+
+# Open a model file as a BeadStore whose beads are memory mapped rather than read
+# mode is the numpy.memmap mode: "c" (copy on write) keeps changes in memory, "r+" writes them to the file and
+# "r" refuses them, which lets any number of processes share the pages of a single file
+# The geometry of its game is in the header, see read_header
+def load_model(path, mode="c"):
+    header = read_header(path)
+    rows, cells = header["rows"], header["cells"]
+
+    store = BeadStore.__new__(BeadStore)
+    offset = header["offset"]
+    store.beads = np.memmap(path, dtype="<i8", mode=mode, offset=offset, shape=(rows, cells))
+    offset += store.beads.nbytes
+    if header["version"] >= 4:
+        store.cumulative = np.memmap(path, dtype="<i8", mode=mode, offset=offset, shape=(rows, cells))
+        offset += store.cumulative.nbytes
+    store.legal = np.memmap(path, dtype=bool, mode=mode, offset=offset, shape=(rows, cells))
+    offset += store.legal.nbytes
+    key_type = np.dtype("<u4" if header["version"] == 1 else "<u8")
+    store.keys = np.fromfile(path, dtype=key_type, count=rows, offset=offset).astype(np.int64)
+    offset += key_type.itemsize * rows
+    store.players = np.fromfile(path, dtype="i1", count=rows, offset=offset)
+    store.rows = {key: row for row, key in enumerate(store.keys.tolist())}
+    store.size = rows
+    store.generation = header["generation"]
+    store.rewards = header["rewards"]
+    store.keep_alive = header["keep_alive"]
+    if header["version"] < 4:
+        store.refresh()
+    return store
+
+
+# Convert a pickle of matchboxes (as written by Menace) into a model file
+def convert(pickle_file, model_file):
+    # Imported here, as player.menace reads model files too
+    from player.menace import Menace
+    menace = Menace(pickle_file)
+    save_model(model_file, menace.store, geometry=menace.geometry)
+
@@ -0,0 +1,81 @@
+import os
+import random
+
+import numpy as np
+
+import player
+from board import Board, transform_coordinate
+
+# The solved game, indexed by the key of a board: its value for the player to move (1 for a win, 0 for a draw and
+# -1 for a loss with perfect play) and a 9 bit mask of the cells on the minimal board that achieve that value
+_unsolved = -2
+_tables = None
+
+
+# Negamax over the minimal boards, every board being solved once
+def _solve(board, values, best_moves):
+    key = board.key()
+    if values[key] != _unsolved:
+        return values[key]
+    winner = board.winner()
+    if winner:
+        # The game is over: a draw, or won by the player who just moved
+        values[key] = 0 if winner == 3 else -1
+        return values[key]
+    best_value, best_mask = -2, 0
+    for coordinate in board.legal_moves(unique=False):
+        next_board = board.make_move(coordinate)
+        next_board.make_minimal()
+        value = -_solve(next_board, values, best_moves)
+        if value > best_value:
+            best_value, best_mask = value, 0
+        if value == best_value:
+            best_mask |= 1 << (coordinate[0] * 3 + coordinate[1])
+    values[key] = best_value
+    best_moves[key] = best_mask
+    return best_value
+
+
+# Solve the game, or read the solution from cache_file when it exists (writing it there otherwise)
+def solve(cache_file=None):
+    if cache_file and os.path.exists(cache_file):
+        with open(cache_file, "rb") as file:
+            table = np.load(file)
+        return table[0].astype(np.int8), table[1].astype(np.uint16)
+    values = np.full(3 ** 9, _unsolved, dtype=np.int8)
+    best_moves = np.zeros(3 ** 9, dtype=np.uint16)
+    _solve(Board(), values, best_moves)
+    if cache_file:
+        with open(cache_file, "wb") as file:
+            np.save(file, np.stack([values.astype(np.int32), best_moves.astype(np.int32)]))
+    return values, best_moves
+
+
+# A player that never loses: every move is one lookup in the solved game, translated onto the board
+# The game is solved once per process (or read from cache_file), and the player picks one of the best moves at random
+class Perfect(player.Player):
+
+    def __init__(self, cache_file=None, rng=random):
+        global _tables
+        if _tables is None:
+            values, best_moves = solve(cache_file)
+            _tables = values.tolist(), best_moves.tolist()
+        self.values, self.best_moves = _tables
+        self.rng = rng
+
+    # The value of the board for the player to move: 1 for a win, 0 for a draw and -1 for a loss
+    def value(self, board):
+        return self.values[board.key()]
+
+    # The best moves on a board, as coordinates on that board
+    def moves(self, board):
+        key, transform = board.symmetry()
+        mask = self.best_moves[key]
+        return [transform_coordinate(divmod(cell, 3), transform) for cell in range(9) if mask >> cell & 1]
+
+    def move(self, board):
+        return self.rng.choice(self.moves(board))
+
+    def policy(self, board):
+        moves = self.moves(board)
+        return {move: 1.0 / len(moves) for move in moves}
@@ -3,5 +3,14 @@ class Player(object):
     def move(self, board):
         raise NotImplementedError
 
+    # The probability of each move on board, as a dictionary of coordinates to probabilities, for players whose
+    # moves follow a known distribution
+    def policy(self, board):
+        raise NotImplementedError
+
     def game_finished(self, winning_board):
-        pass
\ No newline at end of file
+        pass
+
+    # Release any files the player keeps open, once it is done playing
+    def close(self):
+        pass
@@ -6,3 +6,7 @@ class RandomMove(player.Player):
 
     def move(self, board):
         return random.sample(board.legal_moves(unique=False), 1)[0]
+
+    def policy(self, board):
+        moves = board.legal_moves(unique=False)
+        return {move: 1.0 / len(moves) for move in moves}
@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+from board import Board
+from game_log import GameLog
+import instrumentation
+import player
+
+usage = """Serve games against one shared MENACE over TCP, one line per command, for instance:
+  python server.py --input trained.pickle --output trained.pickle --port 8765
+
+Commands (answers are lines as well, a session can play any number of games one after the other):
+  new [first|second]      start a game, moving first (the default) or second
+  move X Y                make a move on the cell in row X and column Y (counting from 0)
+  board                   show the board
+  stats                   show the response times of the session and of the server
+  quit                    end the session
+
+Answers:
+  board ROWS              the board, rows separated by '/', with X, O and . for an empty cell
+  menace X Y              the move MENACE made
+  turn                    it is the turn of the player
+  result win|draw|loss    the game is over (from the point of view of the player)
+  stats JSON              response times in seconds
+  error MESSAGE           the command could not be carried out"""
+
+_symbols = ".XO"
+
+
+def board_string(board):
+    return "/".join("".join(_symbols[value] for value in row) for row in board.state)
+
+
+# The time it took to answer commands: counts, totals and the extremes, and the most recent times for percentiles
+class Latency(object):
+
+    def __init__(self, samples=10000):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.recent = collections.deque(maxlen=samples)
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+        percentile = lambda fraction: recent[min(int(fraction * len(recent)), len(recent) - 1)] if recent else 0.0
+        return {"count": self.count, "mean": self.total / max(self.count, 1), "max": self.maximum,
+                "p50": percentile(0.5), "p99": percentile(0.99)}
+
+
+# A game against MENACE, with its own game_history so many can be played at the same time
+class Session(object):
+
+    def __init__(self, number):
+        self.number = number
+        self.board = None
+        self.human = None
+        self.moves = []
+        self.game_history = []
+        self.latency = Latency()
+
+
+# Hosts any number of sessions against one MENACE
+# The sessions make moves straight away, learning from finished games is left to a single task that takes the games
+# from a queue one at a time, so reinforcing and saving never interleave
+# A save (after every game with persistence="pickle", on each compaction of the journal otherwise) is only
+# serialized between moves: writing it to disk happens in another thread, during which moves go on
+# Finished games are written to game_log (a game_log.GameLog) when given
+class GameServer(object):
+
+    def __init__(self, menace, game_log=None):
+        self.menace = menace
+        self.game_log = game_log
+        self.sessions = {}
+        self.session_count = 0
+        self.latency = Latency()
+        self.outcomes = [0, 0, 0, 0]
+        self.finished_games = asyncio.Queue()
+        self.learner = None
+
+    async def learn(self):
+        while True:
+            board, game_history = await self.finished_games.get()
+            self.menace.game_finished(board, game_history=game_history, defer_save=True)
+            snapshot, self.menace.pending_snapshot = self.menace.pending_snapshot, None
+            if snapshot is not None:
+                await asyncio.get_running_loop().run_in_executor(None, self.menace.write_snapshot, snapshot)
+            instrumentation.count_games(1, board.turn())
+            self.finished_games.task_done()
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self.learner = asyncio.ensure_future(self.learn())
+        return await asyncio.start_server(self.serve, host, port)
+
+    # Wait until every finished game was learned from
+    async def drain(self):
+        await self.finished_games.join()
+
+    async def serve(self, reader, writer):
+        self.session_count += 1
+        session = Session(self.session_count)
+        self.sessions[session.number] = session
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                answers = self.command(session, line.decode().split())
+                if answers is None:
+                    break
+                writer.write("".join(answer + "\n" for answer in answers).encode())
+                seconds = time.perf_counter() - start
+                session.latency.record(seconds)
+                self.latency.record(seconds)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # A game left unfinished is not learned from
+            self.menace.abandon(session.game_history)
+            del self.sessions[session.number]
+            writer.close()
+
+    # Carry out a command of a session, returns the answers (None to end the session)
+    def command(self, session, words):
+        if not words:
+            return ["error empty command"]
+        name, arguments = words[0], words[1:]
+        if name == "quit":
+            return None
+        if name == "stats":
+            return ["stats " + json.dumps(self.stats(session))]
+        if name == "new":
+            return self.new_game(session, arguments[0] if arguments else "first")
+        if session.board is None:
+            return ["error no game in progress, start one with 'new'"]
+        if name == "board":
+            return ["board " + board_string(session.board)]
+        if name == "move":
+            return self.move(session, arguments)
+        return ["error unknown command %r" % name]
+
+    def new_game(self, session, order):
+        if order not in ("first", "second"):
+            return ["error say 'new first' or 'new second'"]
+        self.menace.abandon(session.game_history)
+        session.board = Board(size=self.menace.geometry.size, win_length=self.menace.geometry.win_length)
+        session.human = 1 if order == "first" else 2
+        session.moves = []
+        if session.human == 2:
+            return self.menace_move(session)
+        return ["board " + board_string(session.board), "turn"]
+
+    def move(self, session, arguments):
+        try:
+            coordinate = tuple(int(argument) for argument in arguments)
+        except ValueError:
+            coordinate = ()
+        if coordinate not in session.board.legal_moves(unique=False):
+            return ["error not a free cell: %s" % " ".join(arguments)]
+        session.board = session.board.make_move(coordinate)
+        session.moves.append(coordinate)
+        if session.board.winner():
+            return self.finish(session)
+        return self.menace_move(session)
+
+    def menace_move(self, session):
+        coordinate = self.menace.move(session.board, game_history=session.game_history)
+        session.board = session.board.make_move(coordinate)
+        session.moves.append(coordinate)
+        answers = ["menace %d %d" % coordinate, "board " + board_string(session.board)]
+        if session.board.winner():
+            return answers[:1] + self.finish(session)
+        return answers + ["turn"]
+
+    def finish(self, session):
+        board, winner = session.board, session.board.winner()
+        self.outcomes[winner] += 1
+        if self.game_log is not None:
+            self.game_log.record(session.moves, winner)
+        self.finished_games.put_nowait((board, session.game_history))
+        session.game_history = []
+        session.board = None
+        result = "draw" if winner == 3 else "win" if winner == session.human else "loss"
+        return ["board " + board_string(board), "result " + result]
+
+    def stats(self, session=None):
+        stats = {"sessions": len(self.sessions), "games": sum(self.outcomes), "latency": self.latency.summary()}
+        if session is not None:
+            stats["session"] = session.latency.summary()
+        return stats
+
+
+async def serve(menace, host, port, report_interval=None, game_log=None):
+    server = GameServer(menace, game_log=game_log)
+    listener = await server.start(host, port)
+    print("Serving on %s" % ", ".join(str(socket.getsockname()) for socket in listener.sockets))
+    async with listener:
+        if report_interval:
+            while True:
+                await asyncio.sleep(report_interval)
+                print(json.dumps(server.stats()))
+        await listener.serve_forever()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=usage, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--input", help="file to load MENACE from")
+    parser.add_argument("--output", help="file to save MENACE to")
+    parser.add_argument("--persistence", default="journal", choices=("pickle", "journal"),
+                        help="how to save MENACE after every game, see player.Menace")
+    parser.add_argument("--log", help="append the games to this game log (see game_log)")
+    parser.add_argument("--report", type=float, default=None, help="print the response times every this many seconds")
+    arguments = parser.parse_args(arguments)
+
+    menace = player.Menace(input_file=arguments.input, output_file=arguments.output,
+                           persistence=arguments.persistence)
+    log = GameLog(arguments.log, size=menace.geometry.size, win_length=menace.geometry.win_length) \
+        if arguments.log else None
+    try:
+        asyncio.run(serve(menace, arguments.host, arguments.port, arguments.report, game_log=log))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if log is not None:
+            log.close()
+        menace.close()
+
+
+if __name__ == "__main__":
+    main()
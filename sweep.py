@@ -0,0 +1,142 @@
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+import numpy as np
+
+import player
+from training.convergence import ConvergenceMonitor, train_until_converged
+from training.evaluation import evaluate
+
+usage = """Train MENACE with every combination of settings and seeds, spread over processes, for instance:
+  python sweep.py --initial-values 3 7 --rewards 3,0,-1 3,1,-1 1,0,-1 --seeds 0 1 2 --opponent random \\
+      --games 20000 --window 2000 --output sweep.csv
+
+Every run records a learning curve (see training.convergence.train_until_converged, with the exact chances against
+the opponent after each window, see training.evaluation) and final scores against RandomMove and Perfect from both
+seats.
+The table is written as CSV (one row per run, the curve as JSON) or, for an --output ending in .json, as JSON."""
+
+OPPONENTS = ("random", "perfect", "self")
+
+
+def _opponent(name, seed):
+    if name == "random":
+        return player.RandomMove()
+    if name == "perfect":
+        return player.Perfect(rng=random.Random(seed))
+    return None
+
+
+# The chances of winning, drawing and losing of menace against opponent from both seats, flattened into columns
+def _scores(menace, opponent, prefix):
+    return {"%s_%s_%s" % (prefix, seat, outcome): probability
+            for seat, chances in evaluate(menace, opponent).items() for outcome, probability in chances.items()}
+
+
+# Train a MENACE with the settings of a run for games games against its opponent, window games at a time
+def run(settings):
+    start = time.time()
+    seed = settings["seed"]
+    random.seed(seed)
+    menace = player.Menace(rng=random.Random(seed), initial_value=settings["initial_value"],
+                           rewards=settings["rewards"], keep_alive=settings["keep_alive"],
+                           pruning=settings["pruning"])
+    opponent = _opponent(settings["opponent"], seed)
+
+    # The exact chances against the opponent after each window
+    def add_chances(record):
+        chances = evaluate(menace, opponent)
+        record.update({"first_win": chances["first"]["win"], "second_win": chances["second"]["win"],
+                       "first_loss": chances["first"]["loss"], "second_loss": chances["second"]["loss"]})
+
+    # A monitor that never sees a draw rate high enough, so every run plays all its games
+    curve = train_until_converged(menace, opponent=opponent, window=settings["window"], max_games=settings["games"],
+                                  monitor=ConvergenceMonitor(draw_rate=float("inf")),
+                                  batch_size=settings["batch_size"], rng=np.random.default_rng(seed),
+                                  on_window=add_chances)
+
+    result = dict(settings)
+    result["rewards"] = ",".join(str(reward) for reward in settings["rewards"])
+    result.update(_scores(menace, player.RandomMove(), "random"))
+    result.update(_scores(menace, player.Perfect(), "perfect"))
+    result["seconds"] = time.time() - start
+    result["curve"] = curve
+    return result
+
+
+# Every combination of the settings for every seed
+def runs(initial_values, rewards, keep_alives, prunings, seeds, opponent, games, window, batch_size):
+    return [{"initial_value": initial_value, "rewards": reward, "keep_alive": keep_alive, "pruning": pruning,
+             "seed": seed, "opponent": opponent, "games": games, "window": window, "batch_size": batch_size}
+            for initial_value, reward, keep_alive, pruning, seed
+            in itertools.product(initial_values, rewards, keep_alives, prunings, seeds)]
+
+
+# Carry out the runs on workers processes (one per core by default), returns their results in the order of runs
+def sweep(settings, workers=None):
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1:
+        return [run(run_settings) for run_settings in settings]
+    with multiprocessing.Pool(workers) as pool:
+        return pool.map(run, settings, chunksize=1)
+
+
+def write_table(results, file, format="csv"):
+    if format == "json":
+        json.dump(results, file, indent=2)
+        file.write("\n")
+        return
+    columns = list(results[0]) if results else []
+    writer = csv.DictWriter(file, fieldnames=columns)
+    writer.writeheader()
+    for result in results:
+        writer.writerow(dict(result, curve=json.dumps(result["curve"])))
+
+
+def _rewards(text):
+    rewards = tuple(int(reward) for reward in text.split(","))
+    if len(rewards) != 3:
+        raise argparse.ArgumentTypeError("rewards are three numbers: win,draw,loss")
+    return rewards
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=usage, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--initial-values", type=int, nargs="+", default=[7], help="beads per option of new boxes")
+    parser.add_argument("--rewards", type=_rewards, nargs="+", default=[(3, 0, -1)],
+                        help="change in beads after a win, a draw and a loss, as win,draw,loss")
+    parser.add_argument("--keep-alive", type=int, nargs="+", default=[100],
+                        help="beads the last option of a box gets instead of running out")
+    parser.add_argument("--pruning", type=int, nargs="+", default=[0], help="pruning levels, see menace.prune_moves")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="seeds to repeat every setting with")
+    parser.add_argument("--opponent", choices=OPPONENTS, default="random", help="the opponent to train against")
+    parser.add_argument("--games", type=int, default=10000, help="games to train per run")
+    parser.add_argument("--window", type=int, default=1000, help="games per point of the learning curve")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="train in batches of this many games (not against perfect)")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: one per core)")
+    parser.add_argument("--output", help="file to write the table to (standard output by default)")
+    arguments = parser.parse_args(arguments)
+    if arguments.batch_size and arguments.opponent == "perfect":
+        parser.error("batched training is not possible against perfect")
+
+    settings = runs(arguments.initial_values, arguments.rewards, arguments.keep_alive, arguments.pruning,
+                    arguments.seeds, arguments.opponent, arguments.games, arguments.window, arguments.batch_size)
+    results = sweep(settings, workers=arguments.workers)
+    format = "json" if arguments.output and arguments.output.endswith(".json") else "csv"
+    if arguments.output:
+        with open(arguments.output, "w", newline="") as file:
+            write_table(results, file, format)
+    else:
+        write_table(results, sys.stdout, format)
+    return results
+
+
+if __name__ == "__main__":
+    main()
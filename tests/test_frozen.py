@@ -0,0 +1,21 @@
+import random
+
+import player
+from player.frozen import export_policy
+from training.evaluation import outcome_probabilities
+
+
+def test_frozen_policy_plays_like_its_menace(tmp_path):
+    path = str(tmp_path / "menace.policy")
+    random.seed(0)
+    menace = player.Menace()
+    menace.train(500, opponent=player.RandomMove())
+    export_policy(menace, path, fsync=False)
+    frozen = player.FrozenMenace(path)
+    for opponent in (player.RandomMove(), player.Perfect()):
+        expected = outcome_probabilities(menace, opponent)
+        actual = outcome_probabilities(frozen, opponent)
+        assert max(abs(a - b) for a, b in zip(expected, actual)) < 1e-12
+    menace.greedy = True
+    greedy = player.FrozenMenace(path, greedy=True)
+    assert outcome_probabilities(greedy, player.RandomMove()) == outcome_probabilities(menace, player.RandomMove())
@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+
+import player
+
+
+def trained(path, games, compact_every=1000):
+    random.seed(0)
+    menace = player.Menace(output_file=path, persistence="journal", compact_every=compact_every)
+    for _ in range(games):
+        menace.game(opponent=player.RandomMove())
+    return menace
+
+
+def beads(menace):
+    return menace.store.beads[:menace.store.size]
+
+
+# The snapshot and the journal written since together give the beads as they were
+def test_snapshot_and_journal_reload(tmp_path):
+    path = str(tmp_path / "menace.pickle")
+    menace = trained(path, 50)
+    menace.close()
+    reloaded = player.Menace(input_file=path, persistence="journal")
+    assert np.array_equal(beads(reloaded), beads(menace))
+
+
+# A journal of an older snapshot is already part of the snapshot, so it is not applied again
+def test_stale_journal_is_ignored(tmp_path):
+    path = str(tmp_path / "menace.pickle")
+    menace = trained(path, 50)
+    with open(path + ".journal", "rb") as file:
+        stale = file.read()
+    menace.save()
+    menace.close()
+    with open(path + ".journal", "wb") as file:
+        file.write(stale)
+    reloaded = player.Menace(input_file=path, persistence="journal")
+    assert np.array_equal(beads(reloaded), beads(menace))
+
+
+# A record that was only partly written (a crash while appending) is ignored
+def test_truncated_record_is_ignored(tmp_path):
+    path = str(tmp_path / "menace.pickle")
+    menace = trained(path, 50)
+    menace.close()
+    with open(path + ".journal", "ab") as file:
+        file.write(b"\x01\x02\x03")
+    reloaded = player.Menace(input_file=path, persistence="journal")
+    assert np.array_equal(beads(reloaded), beads(menace))
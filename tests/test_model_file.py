@@ -0,0 +1,61 @@
+import struct
+
+import numpy as np
+import pytest
+
+import player
+from player import model_file
+
+
+def trained_menace(games=100):
+    menace = player.Menace(rewards=(2, 0, -2), keep_alive=10)
+    menace.train(games, opponent=player.RandomMove())
+    return menace
+
+
+def beads(menace):
+    return menace.store.beads[:menace.store.size]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "menace.menace")
+    menace = trained_menace()
+    model_file.save_model(path, menace.store)
+    loaded = player.Menace(input_file=path)
+    assert np.array_equal(beads(loaded), beads(menace))
+    assert np.array_equal(loaded.store.cumulative, menace.store.cumulative[:menace.store.size])
+    assert (loaded.store.rewards, loaded.store.keep_alive) == ((2, 0, -2), 10)
+
+
+# Files of version 1 (a 32 byte header, keys as uint32, always for the standard game) and 2 (the same header with
+# the size and win length, keys as uint64) have no rewards or running totals
+@pytest.mark.parametrize("version", [1, 2])
+def test_old_versions_load(tmp_path, version):
+    path = str(tmp_path / "menace.menace")
+    menace = trained_menace()
+    store = menace.store
+    rows = store.size
+    with open(path, "wb") as file:
+        if version == 1:
+            file.write(struct.pack("<8sIIIQ4x", model_file.MAGIC, 1, rows, 9, 0))
+        else:
+            file.write(struct.pack("<8sIIIQBB2x", model_file.MAGIC, 2, rows, 9, 0, 3, 3))
+        file.write(store.beads[:rows].astype("<i8").tobytes())
+        file.write(store.legal[:rows].astype("u1").tobytes())
+        file.write(store.keys[:rows].astype("<u4" if version == 1 else "<u8").tobytes())
+        file.write(store.players[:rows].astype("i1").tobytes())
+    loaded = player.Menace(input_file=path)
+    assert np.array_equal(beads(loaded), beads(menace))
+    assert np.array_equal(loaded.store.cumulative, store.cumulative[:rows])
+    assert (loaded.store.rewards, loaded.store.keep_alive) == ((3, 0, -1), 100)
+
+
+# A model file is only loaded for the game it was saved for
+def test_other_geometry_is_refused(tmp_path):
+    path = str(tmp_path / "menace.menace")
+    menace = player.Menace(lazy=True, size=4)
+    menace.train(5)
+    model_file.save_model(path, menace.store, geometry=menace.geometry)
+    with pytest.raises(ValueError):
+        player.Menace(input_file=path)
+    assert len(player.Menace(input_file=path, lazy=True, size=4).lazy) == len(menace.lazy)
@@ -0,0 +1,18 @@
+import random
+
+import player
+from game_log import GameLog, read_log
+from tournament import play_games
+from training.replay import replay_log
+
+
+# Every move of a game between random players is (a symmetric equivalent of) an option of a fresh MENACE
+def test_random_games_replay_every_move(tmp_path):
+    random.seed(0)
+    path = str(tmp_path / "random.games")
+    with GameLog(path) as game_log:
+        play_games(player.RandomMove(), player.RandomMove(), 2000, game_log=game_log)
+    cells = read_log(path)[2]
+    games, learned = replay_log(player.Menace(), path)
+    assert games == 2000
+    assert learned == int((cells != 255).sum())
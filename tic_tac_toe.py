@@ -1,23 +1,15 @@
 from board import Board
+import instrumentation
 import player
 import user_interface
 
-# Choose the interface
-ui = user_interface.Graphical()
-# ui = user_interface.CommandLine()
-# ui = user_interface.Minimal()
 
-# Choose the players for respectively the uneven and even moves
-# player1 = player.Menace("trained_menace.pickle", "trained_menace.pickle")
-player1 = player.Menace()
-# player2 = player1 # This does not call the constructor again! so same MENACE
-# player2 = player.Human(ui) # The system needs know where the Human will be providing their input
-player2 = player.RandomMove() # Just make a random move
-
-
-def play_game():
+# Play games between player1 and player2 on a size x size board, win_length in a row winning (by default a full row)
+# Finished games are written to game_log (a game_log.GameLog) when given
+def play_game(ui, player1, player2, size=3, win_length=None, game_log=None):
     # Initialize the gameloop variables
-    board = Board()
+    board = Board(size=size, win_length=win_length)
+    moves = []
     keep_going = True
 
     # Game loop
@@ -35,15 +27,37 @@ def play_game():
             # Notify the players and show the final (winning) board
             player1.game_finished(board)
             player2.game_finished(board)
+            instrumentation.count_games(1, board.turn())
+            if game_log is not None:
+                game_log.record(moves, board.winner())
 
             # Reset board
-            board = Board()
+            board = Board(size=size, win_length=win_length)
+            moves = []
 
         if board.player() == 1:
             move = player1.move(board)
         else:
             move = player2.move(board)
 
-        board = board.make_move(move)
+        # A move on a cell that is not empty leaves the board as it was
+        next_board = board.make_move(move)
+        if next_board is not board:
+            moves.append(move)
+        board = next_board
+
+
+if __name__ == "__main__":
+    # Choose the interface
+    ui = user_interface.Graphical()
+    # ui = user_interface.CommandLine()
+    # ui = user_interface.Minimal()
+
+    # Choose the players for respectively the uneven and even moves
+    # player1 = player.Menace("trained_menace.pickle", "trained_menace.pickle")
+    player1 = player.Menace()
+    # player2 = player1 # This does not call the constructor again! so same MENACE
+    # player2 = player.Human(ui) # The system needs know where the Human will be providing their input
+    player2 = player.RandomMove() # Just make a random move
 
-play_game()
+    play_game(ui, player1, player2)
@@ -0,0 +1,133 @@
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from board import Board
+from game_log import GameLog
+import instrumentation
+import player
+
+usage = """Play games between two players without a user interface, for instance:
+  python tournament.py menace:input=trained.pickle,output=trained.pickle random --games 100000
+  python tournament.py menace self --games 10000 --seed 1
+
+Players:
+  menace[:input=FILE,output=FILE,persistence=pickle|journal,pruning=0|1|2,lazy=1,capacity=N,
+         eviction=lru|least-visited,spill=FILE]
+                                                              a MENACE, optionally loaded from and saved to a file
+                                                              and with pruned matchboxes (see menace.prune_moves),
+                                                              or with matchboxes made as boards come up (lazy)
+  frozen:file=FILE[,greedy=1]                                 a FrozenMenace playing a policy file written by
+                                                              freeze_model.py, optionally always its best move
+  random                                                      a RandomMove player
+  perfect[:cache=FILE]                                        a Perfect player, optionally caching its table
+  self                                                        (second player only) the first player again"""
+
+
+# Build a player from a specification as described in usage
+def make_player(specification, first_player=None):
+    name, _, arguments = specification.partition(":")
+    options = dict(argument.split("=", 1) for argument in arguments.split(",") if argument)
+    if name == "menace":
+        return player.Menace(input_file=options.get("input"), output_file=options.get("output"),
+                             persistence=options.get("persistence", "pickle"),
+                             pruning=int(options.get("pruning", 0)), lazy=bool(int(options.get("lazy", 0))),
+                             capacity=int(options["capacity"]) if "capacity" in options else None,
+                             eviction=options.get("eviction", "lru"), spill_file=options.get("spill"))
+    if name == "frozen":
+        return player.FrozenMenace(options["file"], greedy=bool(int(options.get("greedy", 0))))
+    if name == "random":
+        return player.RandomMove()
+    if name == "perfect":
+        return player.Perfect(cache_file=options.get("cache"))
+    if name == "self" and first_player is not None:
+        return first_player
+    raise ValueError("Unknown player %r" % specification)
+
+
+# Print the outcomes so far (from the point of view of the first player) and the speed they were played at
+def report(outcomes, games, moves, seconds):
+    seconds = max(seconds, 1e-9)
+    print("%d games: %d wins, %d draws, %d losses (%.0f games/s, %.0f moves/s)"
+          % (games, outcomes[1], outcomes[3], outcomes[2], games / seconds, moves / seconds))
+
+
+# Play games between player1 (making the uneven moves) and player2, reporting every report_interval games
+# The games are written to game_log (a game_log.GameLog) when given
+# Returns how often each outcome occurred: index 1 and 2 for wins of the players, 3 for draws
+def play_games(player1, player2, games, report_interval=None, game_log=None):
+    outcomes = [0, 0, 0, 0]
+    moves = 0
+    start = time.time()
+    for game in range(1, games + 1):
+        board = Board()
+        played = []
+        while not board.winner():
+            if board.player() == 1:
+                move = player1.move(board)
+            else:
+                move = player2.move(board)
+            board = board.make_move(move)
+            played.append(move)
+            moves += 1
+        if game_log is not None:
+            game_log.record(played, board.winner())
+        player1.game_finished(board)
+        if player2 is not player1:
+            player2.game_finished(board)
+        outcomes[board.winner()] += 1
+        instrumentation.count_games(1, board.turn())
+        if report_interval and game % report_interval == 0 and game != games:
+            report(outcomes, game, moves, time.time() - start)
+    report(outcomes, games, moves, time.time() - start)
+    return outcomes
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=usage, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("player1", help="the player making the first move")
+    parser.add_argument("player2", help="the player making the second move")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random number generators")
+    parser.add_argument("--report", type=int, default=None, help="report the results every this many games")
+    parser.add_argument("--exact", action="store_true",
+                        help="compute the exact chances of each outcome from the policies of the players instead")
+    parser.add_argument("--log", help="append the games to this game log (see game_log)")
+    parser.add_argument("--profile", help="write timings as JSON lines to this file ('-' for standard error)")
+    parser.add_argument("--profile-interval", type=float, default=10.0, help="seconds between timing reports")
+    arguments = parser.parse_args(arguments)
+
+    if arguments.seed is not None:
+        random.seed(arguments.seed)
+        np.random.seed(arguments.seed)
+    player1 = make_player(arguments.player1)
+    player2 = make_player(arguments.player2, first_player=player1)
+    if arguments.exact:
+        from training.evaluation import outcome_probabilities
+        probabilities = outcome_probabilities(player1, player2)
+        print("wins %.6f, draws %.6f, losses %.6f" % (probabilities[1], probabilities[3], probabilities[2]))
+        return probabilities
+
+    log = GameLog(arguments.log) if arguments.log else None
+    try:
+        if arguments.profile:
+            report_file = sys.stderr if arguments.profile == "-" else open(arguments.profile, "a")
+            profiler = instrumentation.enable(report_file=report_file, report_interval=arguments.profile_interval)
+            outcomes = play_games(player1, player2, arguments.games, report_interval=arguments.report, game_log=log)
+            profiler.report()
+            instrumentation.disable()
+            return outcomes
+        return play_games(player1, player2, arguments.games, report_interval=arguments.report, game_log=log)
+    finally:
+        if log is not None:
+            log.close()
+        player1.close()
+        if player2 is not player1:
+            player2.close()
+
+
+if __name__ == "__main__":
+    main()
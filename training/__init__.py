@@ -0,0 +1,5 @@
+from training.batch import play_batch, train_batched
+from training.parallel import train_parallel
+from training.convergence import ConvergenceMonitor, train_until_converged
+from training.replay import replay_log
+from training.evaluation import evaluate, outcome_probabilities
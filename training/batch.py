@@ -0,0 +1,112 @@
+import numpy as np
+
+import board
+from game_log import NO_MOVE
+import instrumentation
+import player
+
+
+# Batched games are played on the standard board and need a matchbox for every board up front, in the store of menace
+# (which has to be able to learn)
+def check_batched(menace):
+    if menace.geometry is not board.STANDARD:
+        raise ValueError("batched games are only played on the standard 3 x 3 board")
+    if menace.lazy is not None:
+        raise ValueError("lazy matchboxes are trained one game at a time")
+    if menace.read_only:
+        raise ValueError("a model mapped read only does not learn")
+
+
+# Play games in lockstep, every game being a slot in a handful of arrays
+# MENACE picks its moves from the beads in store (looked up through rows, see BeadStore.row_lookup)
+# Without an opponent MENACE plays both sides, with a RandomMove opponent MENACE plays the first player
+# Returns the winner of every game, the moves MENACE made: the rows, cells and turn (9 x games arrays, row -1
+# marking turns without a MENACE move) and the number of moves made in all games
+# Given board_cells (a games x 9 array), the cells played in each game are written to it, in order
+def play_batch(store, rows, games, opponent=None, rng=None, board_cells=None):
+    if opponent is not None and not isinstance(opponent, player.RandomMove):
+        raise ValueError("Batched games can only be played against MENACE itself or RandomMove")
+    if rng is None:
+        rng = np.random.default_rng()
+
+    crosses = np.zeros(games, dtype=np.int64)
+    noughts = np.zeros(games, dtype=np.int64)
+    winners = np.zeros(games, dtype=np.int8)
+    history_rows = np.full((9, games), -1, dtype=np.intp)
+    history_cells = np.zeros((9, games), dtype=np.intp)
+
+    playing = np.arange(games)
+    moves = 0
+    for turn in range(9):
+        moves += len(playing)
+        to_move = turn % 2 + 1
+        own_crosses, own_noughts = crosses[playing], noughts[playing]
+        if opponent is None or to_move == 1:
+            keys, transforms = board.batch_symmetry(own_crosses, own_noughts)
+            box_rows = rows[keys]
+            if (box_rows < 0).any():
+                raise ValueError("No matchbox for a board, batched games need a matchbox for every board")
+            # Pick a cell with a probability proportional to its beads
+            cumulative = store.cumulative[box_rows]
+            draws = rng.random(len(playing)) * cumulative[:, -1]
+            cells = (cumulative > draws[:, None]).argmax(axis=1)
+            history_rows[turn, playing] = box_rows
+            history_cells[turn, playing] = cells
+            cells = board.batch_transform_cells(cells, transforms)
+        else:
+            # Pick one of the empty cells, all being equally likely
+            occupied = (own_crosses | own_noughts)[:, None] >> np.arange(9) & 1
+            cells = (rng.random((len(playing), 9)) * (1 - occupied)).argmax(axis=1)
+
+        if board_cells is not None:
+            board_cells[playing, turn] = cells
+        if to_move == 1:
+            crosses[playing] = own_crosses | (1 << cells)
+        else:
+            noughts[playing] = own_noughts | (1 << cells)
+
+        outcome = board.batch_winner(crosses[playing], noughts[playing])
+        winners[playing] = outcome
+        playing = playing[outcome == 0]
+        if len(playing) == 0:
+            break
+
+    return winners, history_rows, history_cells, moves
+
+
+# The change in beads for the moves of a batch: the win, draw and loss values of rewards (by default those of the
+# store, see BeadStore.rewards)
+def batch_rewards(store, winners, history_rows, rewards=None):
+    win, draw, loss = rewards or store.rewards
+    played = history_rows >= 0
+    rows = history_rows[played]
+    game_winners = np.broadcast_to(winners, history_rows.shape)[played]
+    deltas = np.where(store.players[rows] == game_winners, win, loss)
+    deltas[game_winners == 3] = draw
+    return rows, deltas, played
+
+
+# Have MENACE play games in batches of batch_size, reinforcing the beads once after each batch
+# The games are written to game_log (a game_log.GameLog) when given
+# Returns the outcomes as counted by Menace.train: draws, wins of player 1 and wins of player 2
+def train_batched(menace, iterations, batch_size=1000, opponent=None, rng=None, game_log=None):
+    check_batched(menace)
+    if rng is None:
+        rng = np.random.default_rng()
+    store = menace.store
+    rows = store.row_lookup()
+    outcomes = [0, 0, 0]
+    while iterations > 0:
+        games = min(batch_size, iterations)
+        iterations -= games
+        board_cells = None if game_log is None else np.full((games, 9), NO_MOVE, dtype=np.uint8)
+        winners, history_rows, history_cells, moves = play_batch(store, rows, games, opponent=opponent, rng=rng,
+                                                                 board_cells=board_cells)
+        if game_log is not None:
+            game_log.record_batch(board_cells, winners)
+        box_rows, deltas, played = batch_rewards(store, winners, history_rows)
+        store.apply(box_rows, history_cells[played], deltas)
+        instrumentation.count_games(games, moves)
+        counts = np.bincount(winners % 3, minlength=3)
+        outcomes = [total + int(count) for total, count in zip(outcomes, counts)]
+    return outcomes
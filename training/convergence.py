@@ -0,0 +1,75 @@
+import numpy as np
+
+from training.batch import check_batched, train_batched
+
+
+# The probability of each option in every matchbox that has beads (a row of zeros for boxes that have none)
+def bead_distribution(store):
+    beads = store.beads[:store.size].astype(np.float64)
+    totals = beads.sum(axis=1, keepdims=True)
+    return np.divide(beads, totals, out=np.zeros_like(beads), where=totals > 0)
+
+
+# How much the distributions of the matchboxes changed: the total variation distance between before and after,
+# averaged over the matchboxes (that existed before)
+def bead_change(before, after):
+    after = after[:len(before)]
+    return float(0.5 * np.abs(after - before).sum(axis=1).mean())
+
+
+# Decides whether training has converged from the outcomes of successive windows of games
+# Training converged once draw_rate (draws as a fraction of the window) was reached in patience windows in a row,
+# and, with a max_bead_change, the bead distributions changed less than that in those windows
+class ConvergenceMonitor(object):
+
+    def __init__(self, draw_rate=0.9, patience=3, max_bead_change=None):
+        self.draw_rate = draw_rate
+        self.patience = patience
+        self.max_bead_change = max_bead_change
+        self.streak = 0
+
+    # Record a window, returns whether training converged
+    def update(self, record):
+        settled = record["draw_rate"] >= self.draw_rate
+        if self.max_bead_change is not None:
+            settled = settled and record["bead_change"] <= self.max_bead_change
+        self.streak = self.streak + 1 if settled else 0
+        return self.streak >= self.patience
+
+
+# Train menace against opponent (itself when None, otherwise MENACE plays first) window games at a time, until
+# monitor (a ConvergenceMonitor) says it converged or max_games were played
+# Games are played in batches of batch_size when given (see Menace.train)
+# Returns the learning curve: a record per window with the games played so far, the wins, draws and losses in the
+# window (for self play: of the first player), the draw rate and the change in bead distributions
+# on_window, when given, is called with every record before monitor sees it, and can add to it
+def train_until_converged(menace, opponent=None, window=1000, max_games=1000000, monitor=None, batch_size=None,
+                          rng=None, on_window=None):
+    if batch_size:
+        check_batched(menace)
+    if monitor is None:
+        monitor = ConvergenceMonitor()
+    curve = []
+    games = 0
+    distribution = bead_distribution(menace.store)
+    while games < max_games:
+        played = min(window, max_games - games)
+        if batch_size:
+            draws, wins, losses = train_batched(menace, played, batch_size=batch_size, opponent=opponent, rng=rng)
+        else:
+            outcomes = [0, 0, 0]
+            for _ in range(played):
+                outcomes[menace.game(opponent=opponent) % 3] += 1
+            draws, wins, losses = outcomes
+        games += played
+
+        new_distribution = bead_distribution(menace.store)
+        record = {"games": games, "wins": wins, "draws": draws, "losses": losses, "draw_rate": draws / played,
+                  "bead_change": bead_change(distribution, new_distribution)}
+        distribution = new_distribution
+        if on_window is not None:
+            on_window(record)
+        curve.append(record)
+        if monitor.update(record):
+            break
+    return curve
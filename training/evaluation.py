@@ -0,0 +1,48 @@
+from board import Board
+
+_seats = {1: "first", 2: "second"}
+
+
+# The exact probability of each outcome of a game between player1 (making the uneven moves) and player2, from the
+# policies of the players (see Player.policy), instead of counting the outcomes of many games
+# Both policies treat boards that are rotations or mirror images of each other alike, so every minimal board is
+# solved once: the probabilities of a board are those of the boards its moves lead to, weighted by the policy
+# Returns the probabilities as counted by tournament.play_games: index 1 and 2 for wins of the players, 3 for draws
+def outcome_probabilities(player1, player2, board=None):
+    solved = {}
+
+    def solve(board):
+        key = board.key()
+        probabilities = solved.get(key)
+        if probabilities is not None:
+            return probabilities
+        winner = board.winner()
+        probabilities = [0.0, 0.0, 0.0, 0.0]
+        if winner:
+            probabilities[winner] = 1.0
+        else:
+            to_move = player1 if board.player() == 1 else player2
+            for move, probability in to_move.policy(board).items():
+                if probability > 0:
+                    outcome = solve(board.make_move(move))
+                    for winner in (1, 2, 3):
+                        probabilities[winner] += probability * outcome[winner]
+        solved[key] = probabilities
+        return probabilities
+
+    return solve(board if board is not None else Board())
+
+
+# The exact chances of menace against opponent (itself when None) from either seat: for menace moving first and
+# for menace moving second, the probability that menace wins, draws and loses
+def evaluate(menace, opponent=None):
+    if opponent is None:
+        opponent = menace
+    evaluation = {}
+    for seat, name in _seats.items():
+        if seat == 1:
+            probabilities = outcome_probabilities(menace, opponent)
+        else:
+            probabilities = outcome_probabilities(opponent, menace)
+        evaluation[name] = {"win": probabilities[seat], "draw": probabilities[3], "loss": probabilities[3 - seat]}
+    return evaluation
@@ -0,0 +1,58 @@
+import multiprocessing
+
+import numpy as np
+
+import instrumentation
+from training.batch import batch_rewards, check_batched, play_batch
+
+
+# Play games against a snapshot of the beads without learning from them
+# Returns the summed change in beads for every (row, cell), the outcomes as counted by Menace.train and the
+# number of moves made
+def _play_snapshot(store, games, batch_size, opponent, seed):
+    rng = np.random.default_rng(seed)
+    rows = store.row_lookup()
+    deltas = np.zeros((len(store), store.beads.shape[1]), dtype=np.int64)
+    outcomes = np.zeros(3, dtype=np.int64)
+    total_moves = 0
+    while games > 0:
+        batch = min(batch_size, games)
+        games -= batch
+        winners, history_rows, history_cells, moves = play_batch(store, rows, batch, opponent=opponent, rng=rng)
+        box_rows, box_deltas, played = batch_rewards(store, winners, history_rows)
+        np.add.at(deltas, (box_rows, history_cells[played]), box_deltas)
+        outcomes += np.bincount(winners % 3, minlength=3)
+        total_moves += moves
+    return deltas, outcomes, total_moves
+
+
+def _worker(arguments):
+    return _play_snapshot(*arguments)
+
+
+# Have MENACE play games on several processes at once
+# Every round each of the workers plays sync_interval games against the same snapshot of the beads, after which
+# their changes are merged into the store (removing options and keeping boxes alive as in BeadStore.apply)
+# The random generator of each worker derives from seed, so a run can be repeated with the same seed and workers
+# Returns the outcomes as counted by Menace.train: draws, wins of player 1 and wins of player 2
+def train_parallel(menace, iterations, workers=None, sync_interval=10000, batch_size=1000, opponent=None,
+                   seed=None):
+    check_batched(menace)
+    workers = workers or multiprocessing.cpu_count()
+    seeds = np.random.SeedSequence(seed)
+    store = menace.store
+    outcomes = np.zeros(3, dtype=np.int64)
+    with multiprocessing.Pool(workers) as pool:
+        while iterations > 0:
+            games = min(workers * sync_interval, iterations)
+            iterations -= games
+            shares = [games // workers + (worker < games % workers) for worker in range(workers)]
+            tasks = [(store, share, batch_size, opponent, worker_seed)
+                     for share, worker_seed in zip(shares, seeds.spawn(workers)) if share > 0]
+            results = pool.map(_worker, tasks)
+            deltas = sum(worker_deltas for worker_deltas, _, _ in results)
+            rows, cells = np.nonzero(deltas)
+            store.apply(rows, cells, deltas[rows, cells])
+            outcomes += sum(worker_outcomes for _, worker_outcomes, _ in results)
+            instrumentation.count_games(games, sum(moves for _, _, moves in results))
+    return [int(count) for count in outcomes]
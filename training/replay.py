@@ -0,0 +1,87 @@
+import numpy as np
+
+import board
+from game_log import NO_MOVE, read_log
+from training.batch import batch_rewards
+
+
+# Train menace on the games in a game log (see game_log) instead of playing them
+# The games are replayed batch_size at a time as arrays, and the beads are changed once per batch as with
+# batched training (see BeadStore.apply), with rewards giving the change for a win, a draw and a loss (by default
+# those of the store of menace)
+# players are the sides that learn from the games, by default both, so only the moves of MENACE are learned from a
+# log of games against another player with players=(1,)
+# A move is learned as the option of its matchbox that leads to the same board up to symmetry (a matchbox keeps one
+# move of each set of symmetric moves), and only moves that are no longer an option of their matchbox are skipped
+# Returns the number of games and the number of moves that were learned from
+def replay_log(menace, path, batch_size=100000, rewards=None, players=(1, 2)):
+    if menace.read_only:
+        raise ValueError("a model mapped read only does not learn")
+    size, win_length, log_cells, log_winners = read_log(path)
+    if (size, win_length) != (3, 3):
+        raise ValueError("Only logs of 3 x 3 games can be replayed")
+    store = menace.store
+    rows = store.row_lookup()
+    learned = 0
+    for start in range(0, len(log_winners), batch_size):
+        cells = np.asarray(log_cells[start:start + batch_size], dtype=np.intp).T
+        winners = np.asarray(log_winners[start:start + batch_size], dtype=np.int8)
+        history_rows, history_cells = replay_moves(rows, cells, store.legal)
+        for side in (1, 2):
+            if side not in players:
+                history_rows[side - 1::2] = -1
+        box_rows, deltas, played = batch_rewards(store, winners, history_rows, rewards=rewards)
+        box_cells = history_cells[played]
+        options = store.beads[box_rows, box_cells] > 0
+        store.apply(box_rows[options], box_cells[options], deltas[options])
+        learned += int(options.sum())
+    return len(log_winners), learned
+
+
+# The keys of the boards after the player to move played cells
+def _next_keys(crosses, noughts, cells, crosses_move):
+    if crosses_move:
+        return board.batch_symmetry(crosses | 1 << cells, noughts)[0]
+    return board.batch_symmetry(crosses, noughts | 1 << cells)[0]
+
+
+# Replay the cells played in games (9 x games, NO_MOVE after the last move) on arrays of bitboards
+# legal holds the options of the matchboxes (see BeadStore.legal): a move that is not an option of its matchbox
+# itself is mapped to the option that leads to the same board up to symmetry, when there is one
+# Returns the rows of the matchboxes for each move and the cell played on the matchbox's (minimal) board, as
+# returned by training.batch.play_batch (row -1 marking turns without a move or without a matchbox)
+def replay_moves(rows, cells, legal):
+    turns, games = cells.shape
+    crosses = np.zeros(games, dtype=np.int64)
+    noughts = np.zeros(games, dtype=np.int64)
+    history_rows = np.full((turns, games), -1, dtype=np.intp)
+    history_cells = np.zeros((turns, games), dtype=np.intp)
+    for turn in range(turns):
+        playing = np.flatnonzero(cells[turn] != NO_MOVE)
+        if len(playing) == 0:
+            break
+        played = cells[turn, playing]
+        own_crosses, own_noughts = crosses[playing], noughts[playing]
+        keys, transforms = board.batch_symmetry(own_crosses, own_noughts)
+        box_rows = rows[keys]
+        minimal = board.batch_minimal_cells(played, transforms)
+        boxed = box_rows >= 0
+        stray = np.flatnonzero(boxed & ~legal[box_rows, minimal])
+        if len(stray):
+            next_keys = _next_keys(own_crosses[stray], own_noughts[stray], played[stray], turn % 2 == 0)
+            found = np.zeros(len(stray), dtype=bool)
+            for option in range(legal.shape[1]):
+                candidates = np.flatnonzero(~found & legal[box_rows[stray], option])
+                stray_games = stray[candidates]
+                option_cells = board.batch_transform_cells(np.full(len(stray_games), option), transforms[stray_games])
+                same = _next_keys(own_crosses[stray_games], own_noughts[stray_games], option_cells,
+                                  turn % 2 == 0) == next_keys[candidates]
+                minimal[stray_games[same]] = option
+                found[candidates[same]] = True
+        history_rows[turn, playing] = box_rows
+        history_cells[turn, playing] = minimal
+        if turn % 2 == 0:
+            crosses[playing] |= 1 << played
+        else:
+            noughts[playing] |= 1 << played
+    return history_rows, history_cells
@@ -1,4 +1,11 @@
 from user_interface.user_interface import UI
-from user_interface.graphical import Graphical
 from user_interface.command_line import CommandLine
-from user_interface.minimal import Minimal
\ No newline at end of file
+from user_interface.minimal import Minimal
+
+
+# Graphical needs pygame and opens a window, so it is only imported once someone asks for it
+def __getattr__(name):
+    if name == "Graphical":
+        from user_interface.graphical import Graphical
+        return Graphical
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -1,17 +1,22 @@
 import user_interface
+from user_interface.score import ScoreStats
 
 
 class CommandLine(user_interface.UI):
 
     symbol = [" ", "X", "O"]
 
+    # The score is exported to export_file every export_every games when given (see ScoreStats)
+    def __init__(self, export_file=None, export_every=1000):
+        self.stats = ScoreStats(export_file=export_file, export_every=export_every)
+
     def render(self, board=None):
         row_strings = []
-        for row in range(3):
-            values = [self.symbol[board.cell((row, col))] for col in range(3)]
+        for row in range(board.size):
+            values = [self.symbol[board.cell((row, col))] for col in range(board.size)]
             row_strings.append(" " + " | ".join(values) + " ")
 
-        print("\n---|---|---\n".join(row_strings))
+        print(("\n" + "|".join(["---"] * board.size) + "\n").join(row_strings))
         print("")
 
     def get_move(self, board):
@@ -26,6 +31,7 @@ class CommandLine(user_interface.UI):
                 print("please provide a single character")
 
     def add_score(self, winner):
+        user_interface.UI.add_score(self, winner)
         if winner in [1,2]:
             player = self.symbol[winner]
         else:
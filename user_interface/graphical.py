@@ -2,6 +2,7 @@ import pygame, pygame.locals
 import sys
 
 import user_interface
+from user_interface.score import ScoreStats
 
 red = (255, 0, 0)
 green = (0, 255, 0)
@@ -9,82 +10,153 @@ black = (0, 0, 0)
 white = (255, 255, 255)
 
 
+# Rendering only redraws what changed since the last frame: the cells whose value changed and the score once it
+# changed (with the text rendered once per score), and only those parts of the screen are updated
+# render_every only renders every so many calls to render (i.e. moves), render_games only the games of which the
+# number is a multiple of it, and fps caps the frames per second (None runs as fast as possible), so training can
+# be watched without slowing it down to the speed of the window
+# The score shown is that of the last score_window games, and it is exported to export_file every export_every games
+# when given (see ScoreStats)
 class Graphical(user_interface.UI):
 
-    def __init__(self, side=160, line=10):
+    # A window for boards of size x size cells
+    def __init__(self, side=160, line=10, size=3, render_every=1, render_games=1, fps=120, score_window=500,
+                 export_file=None, export_every=1000):
         self.side_width = side
         self.line_width = line
-
+        self.size = size
+        self.render_every = render_every
+        self.render_games = render_games
+        self.fps = fps
+        self.renders = 0
+        self.games = 0
+
+        # Wins of player 1, wins of player 2 and draws in the last score_window games
         self.score = [0, 0, 0]
-        self.score_100 = [0, 0, 0]
+        self.score_window = score_window
+        self.stats = ScoreStats(windows=(score_window,), export_file=export_file, export_every=export_every)
 
-        screen_size = (3 * self.side_width + 2 * self.line_width, 4 * self.side_width + 2 * self.line_width)
+        board_width = size * self.side_width + (size - 1) * self.line_width
+        screen_size = (board_width, board_width + self.side_width)
         self.screen = pygame.display.set_mode(screen_size)
         self.clock = pygame.time.Clock()
 
-        self.score = [0, 0, 0]
         pygame.font.init()
         # font = pygame.font.SysFont("freesansbold", 72)
         self.font = pygame.font.SysFont(None, 72)
 
+        # The empty board, to restore cells from, and what is on the screen: the value of each cell and the score
+        self.background = None
+        self.shown_cells = None
+        self.shown_score = None
+        self.score_surfaces = []
+        self.score_surfaces_score = None
+
     def index_to_coord(self, index):
         return index * (self.side_width + self.line_width)
 
     def index_to_rect(self, coordinate):
         return pygame.Rect(self.index_to_coord(coordinate[0]), self.index_to_coord(coordinate[1]), self.side_width, self.side_width)
 
+    # The figures are kept within their cells, so a cell can be redrawn without touching its neighbours
     def draw_x(self, row, col):
         rect = self.index_to_rect((row, col))
+        self.screen.set_clip(rect)
         pygame.draw.line(self.screen, red, rect.topleft, rect.bottomright, self.line_width)
         pygame.draw.line(self.screen, red, rect.topright, rect.bottomleft, self.line_width)
+        self.screen.set_clip(None)
 
     def draw_o(self, row, col):
         rect = self.index_to_rect((row, col))
         pygame.draw.ellipse(self.screen, green, rect, self.line_width)
 
-    def draw_score(self, text, y_index):
-        score_text = self.font.render(text, True, black)
-        width, height = pygame.display.get_surface().get_size()
-        text_rect = score_text.get_rect(center=(width / 2, height - y_index))
-        self.screen.blit(score_text, text_rect)
+    # Redraw the cell at coordinate of the board as value, returns the part of the screen that changed
+    def draw_cell(self, coordinate, value):
+        col, row = coordinate
+        rect = self.index_to_rect((row, col))
+        self.screen.blit(self.background, rect, rect)
+        if value == 1:
+            self.draw_x(row, col)
+        elif value == 2:
+            self.draw_o(row, col)
+        return rect
+
+    # Draw the score below the board, returns the part of the screen that changed
+    # The text is only rendered when the score changed since it was last rendered
+    def draw_score(self):
+        width, height = self.screen.get_size()
+        if self.score_surfaces_score != self.score:
+            self.score_surfaces_score = list(self.score)
+            texts = [("wins %d/%d" % (self.score[0], sum(self.score)), 110),
+                     ("(draws %d, losses %d)" % (self.score[2], self.score[1]), 40)]
+            self.score_surfaces = []
+            for text, y_index in texts:
+                score_text = self.font.render(text, True, black)
+                self.score_surfaces.append((score_text, score_text.get_rect(center=(width / 2, height - y_index))))
+        board_width = self.size * self.side_width + (self.size - 1) * self.line_width
+        area = pygame.Rect(0, board_width, width, height - board_width)
+        self.screen.blit(self.background, area, area)
+        for score_text, text_rect in self.score_surfaces:
+            self.screen.blit(score_text, text_rect)
+        self.shown_score = list(self.score)
+        return area
 
     def draw_board(self):
         # Make the screen white.
         self.screen.fill(white)
 
-        # Calculate where the lines should be
+        # Calculate where the lines should be, and draw them in those locations
         width = self.screen.get_rect().width
-        line1 = self.side_width + (self.line_width // 2)
-        line2 = 2 * self.side_width + (3 * self.line_width // 2)
+        for index in range(1, self.size):
+            line = index * self.side_width + ((2 * index - 1) * self.line_width // 2)
+            pygame.draw.line(self.screen, black, (line, 0), (line, width), self.line_width)
+            pygame.draw.line(self.screen, black, (0, line), (width, line), self.line_width)
 
-        # Draw lines in those locations
-        pygame.draw.line(self.screen, black, (line1, 0), (line1, width), self.line_width)
-        pygame.draw.line(self.screen, black, (line2, 0), (line2, width), self.line_width)
-        pygame.draw.line(self.screen, black, (0, line1), (width, line1), self.line_width)
-        pygame.draw.line(self.screen, black, (0, line2), (width, line2), self.line_width)
+    # Draw everything again on the next render
+    def redraw(self):
+        self.background = None
 
     def render(self, board):
-        self.draw_board()
-
-        # Go through the game board
+        self.renders += 1
+        if self.renders % self.render_every or self.games % self.render_games:
+            return
+
+        if self.background is None:
+            # The first frame (or one after redraw) draws the whole screen
+            self.draw_board()
+            self.background = self.screen.copy()
+            self.shown_cells = [0] * self.size * self.size
+            self.shown_score = None
+            changed = [self.screen.get_rect()]
+        else:
+            changed = []
+
+        # Go through the game board, redrawing the cells that changed
+        cells = self.shown_cells
         if board is not None:
-            for row in range(3):
-                for col in range(3):
-                    value = board.cell((col, row))
-                    # Draw the appropriate figure
-                    if value == 1:
-                        self.draw_x(row, col)
-                    if value == 2:
-                        self.draw_o(row, col)
-
-        self.draw_score("wins %d/%d" % (self.score[0], sum(self.score)), 110)
-        self.draw_score("(draws %d, losses %d)" % (self.score[2], self.score[1]), 40)
-
-        # Update the screen
-        pygame.display.update()
-
-    def tick(self, fps=120):
-        self.clock.tick(fps)
+            for index, coordinate in enumerate(board.geometry.cells):
+                value = board.cell(coordinate)
+                if value != cells[index]:
+                    cells[index] = value
+                    changed.append(self.draw_cell(coordinate, value))
+        else:
+            for index, value in enumerate(cells):
+                if value:
+                    cells[index] = 0
+                    changed.append(self.draw_cell(divmod(index, self.size), 0))
+
+        if self.shown_score != self.score:
+            changed.append(self.draw_score())
+
+        # Update the parts of the screen that changed
+        if changed:
+            pygame.display.update(changed)
+
+    # Limit the frames per second to fps (by default the one given when creating the window, None for no limit)
+    def tick(self, fps=None):
+        fps = fps or self.fps
+        if fps:
+            self.clock.tick(fps)
 
         # If there are 'quit' events, end the game
         for _ in pygame.event.get(pygame.locals.QUIT):
@@ -100,6 +172,5 @@ class Graphical(user_interface.UI):
         return None
 
     def add_score(self, winner):
-        self.score[winner - 1] += 1
-        if sum(self.score) > 500:
-            self.score = [0, 0, 0]
+        self.games += 1
+        self.score = user_interface.UI.add_score(self, winner).window(self.score_window)[1:]
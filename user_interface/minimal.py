@@ -1,12 +1,16 @@
 import user_interface
 import random
-from collections import Counter
+
+from user_interface.score import ScoreStats
 
 
 class Minimal(user_interface.UI):
 
-    def __init__(self):
-        self.score = []
+    # The score is reported every report_every games, and exported to export_file every export_every games when
+    # given (see ScoreStats)
+    def __init__(self, report_every=100, export_file=None, export_every=1000):
+        self.report_every = report_every
+        self.stats = ScoreStats(windows=(report_every,), export_file=export_file, export_every=export_every)
 
     def render(self, board):
         pass
@@ -14,8 +18,11 @@ class Minimal(user_interface.UI):
     def get_move(self, board):
         return random.sample(board.legal_moves(unique=False), 1)[0]
 
+    # Print the outcomes (draws, wins and losses of player 1) of all games and the last report_every games
     def add_score(self, winner):
-        self.score.append(winner)
+        stats = user_interface.UI.add_score(self, winner)
 
-        if len(self.score) % 100 == 0:
-            print(Counter(self.score), Counter(self.score[-100:-1]))
+        if stats.games % self.report_every == 0:
+            totals, recent = stats.totals, stats.window(self.report_every)
+            print("%d games: %d draws, %d wins, %d losses; last %d: %d draws, %d wins, %d losses"
+                  % (stats.games, totals[3], totals[1], totals[2], self.report_every, recent[3], recent[1], recent[2]))
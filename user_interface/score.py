@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+
+_outcomes = {1: "wins", 2: "losses", 3: "draws"}
+
+
+# Statistics over the outcomes of a stream of games (winner 1 or 2, or 3 for a draw), in constant memory:
+# the totals since the start, the counts over the last games for each of the window sizes (kept in ring buffers)
+# and exponentially weighted rates of each outcome for each of the decays (the weight of the newest game)
+# Outcomes are counted from the point of view of player 1: a win of player 2 is a loss
+# With an export_file a summary is written to it as a line of JSON every export_every games
+class ScoreStats(object):
+
+    def __init__(self, windows=(100, 1000, 10000), decays=(0.01, 0.001), export_file=None, export_every=1000):
+        self.totals = [0, 0, 0, 0]
+        self.windows = {size: (np.zeros(size, dtype=np.int8), [0, 0, 0, 0]) for size in windows}
+        self.decays = decays
+        self.rates = {decay: [0.0, 0.0, 0.0, 0.0] for decay in decays}
+        self.games = 0
+        self.export_file = export_file
+        self.export_every = export_every
+
+    def add(self, winner):
+        position = self.games
+        self.games += 1
+        self.totals[winner] += 1
+        for size, (ring, counts) in self.windows.items():
+            # The oldest game in the window makes room for this one
+            index = position % size
+            if position >= size:
+                counts[ring[index]] -= 1
+            ring[index] = winner
+            counts[winner] += 1
+        for decay, rates in self.rates.items():
+            for outcome in (1, 2, 3):
+                rates[outcome] += decay * ((outcome == winner) - rates[outcome])
+        if self.export_file is not None and self.games % self.export_every == 0:
+            self.export()
+
+    # How often each outcome occurred in the last size games (one of the window sizes), indexed by winner
+    def window(self, size):
+        return list(self.windows[size][1])
+
+    # The exponentially weighted rate of each outcome, indexed by winner
+    def rate(self, decay):
+        return list(self.rates[decay])
+
+    def summary(self):
+        def named(counts):
+            return {name: counts[outcome] for outcome, name in _outcomes.items()}
+        return {"games": self.games, "totals": named(self.totals),
+                "windows": {str(size): named(counts) for size, (_, counts) in self.windows.items()},
+                "rates": {str(decay): named(rates) for decay, rates in self.rates.items()}}
+
+    # Write the summary as a line of JSON to file (by default export_file)
+    def export(self, file=None):
+        file = file or self.export_file
+        file.write(json.dumps(self.summary()) + "\n")
+        file.flush()
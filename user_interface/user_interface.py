@@ -1,4 +1,9 @@
+from user_interface.score import ScoreStats
+
+
 class UI(object):
+    # The outcomes of the games played so far, made on the first score (see add_score)
+    stats = None
 
     def render(self, board):
         raise NotImplementedError
@@ -9,5 +14,9 @@ class UI(object):
     def tick(self):
         pass
 
+    # Interfaces showing the score record it first, returns the statistics so far
     def add_score(self, winner):
-        pass
+        if self.stats is None:
+            self.stats = ScoreStats()
+        self.stats.add(winner)
+        return self.stats